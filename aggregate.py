@@ -0,0 +1,133 @@
+"""Group-by aggregation over precomputed group indices.
+
+A ``GroupIndex`` records each row's group number and the row positions of each
+group, built once when the data loads. Counts, sums, means (optionally
+weighted) and standard deviations are then single ``np.bincount`` passes over
+all groups at once, and order statistics (min, max, median, percentiles) are
+lookups into each group's slice of a ``SortedColumn``.
+
+Metrics are written ``column:aggregate`` or, for weighted sums and means,
+``column:aggregate:weight`` (e.g. ``GDP:mean:Population``). Percentiles are
+``p`` followed by the percentage, e.g. ``Literacy:p90``.
+"""
+import numpy as np
+
+from histogram import SortedColumn, quantiles
+
+AGGREGATES = ('count', 'sum', 'mean', 'std', 'min', 'max', 'median', 'p<0-100>')
+
+# Aggregates that accept a weight column
+WEIGHTED = ('sum', 'mean')
+
+class GroupIndex:
+    """Group number of each row (-1 for none) and the row positions of each group"""
+
+    def __init__(self, codes, labels):
+        self.codes = np.asarray(codes, dtype=np.int64)
+        self.labels = list(labels)
+        self.n_groups = len(self.labels)
+        # Stable sort keeps each group's rows in their original order
+        order = np.argsort(self.codes, kind='stable')
+        self.positions = order
+        self.offsets = np.searchsorted(self.codes[order], np.arange(self.n_groups + 1))
+        self.sizes = np.diff(self.offsets)
+
+    def rows(self, group):
+        """Row positions of one group, in ascending order"""
+        return self.positions[self.offsets[group]:self.offsets[group + 1]]
+
+    def _bincount(self, rows, weights=None):
+        return np.bincount(self.codes[rows], weights=weights, minlength=self.n_groups)[:self.n_groups]
+
+    def count(self, values):
+        """Non-missing values per group"""
+        present = (self.codes >= 0) & ~np.isnan(values)
+        return self._bincount(present)
+
+    def sum(self, values, weights=None):
+        """Sum per group, or the sum of ``values * weights`` over rows where both are present"""
+        present = (self.codes >= 0) & ~np.isnan(values)
+        if weights is not None:
+            present &= ~np.isnan(weights)
+            return self._bincount(present, values[present] * weights[present])
+        return self._bincount(present, values[present])
+
+    def mean(self, values, weights=None):
+        """Mean per group, weighted by ``weights`` if given (NaN for groups without values)"""
+        present = (self.codes >= 0) & ~np.isnan(values)
+        if weights is not None:
+            present &= ~np.isnan(weights)
+            totals = self._bincount(present, values[present] * weights[present])
+            denominators = self._bincount(present, weights[present])
+        else:
+            totals = self._bincount(present, values[present])
+            denominators = self._bincount(present).astype(float)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(denominators != 0, totals / denominators, np.nan)
+
+    def std(self, values):
+        """Sample standard deviation per group (NaN for groups with fewer than two values)"""
+        present = (self.codes >= 0) & ~np.isnan(values)
+        counts = self._bincount(present)
+        means = self.mean(values)
+        deviations = values[present] - means[self.codes[present]]
+        squares = self._bincount(present, deviations * deviations)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(counts > 1, np.sqrt(squares / (counts - 1)), np.nan)
+
+    def sorted_column(self, values):
+        """Each group's non-missing values, sorted, for order statistics"""
+        return SortedColumn(values, self.codes, self.n_groups)
+
+def parse_metric(spec):
+    """Split ``column:aggregate[:weight]`` into ``(column, aggregate, weight)``, raising ValueError if invalid"""
+    parts = [part.strip() for part in spec.split(':')]
+    if len(parts) not in (2, 3) or not all(parts):
+        raise ValueError(f"Invalid metric '{spec}', expected column:aggregate or column:aggregate:weight")
+    column, aggregate = parts[0], parts[1].lower()
+    weight = parts[2] if len(parts) == 3 else None
+
+    if aggregate.startswith('p'):
+        try:
+            percent = float(aggregate[1:])
+        except ValueError:
+            percent = -1
+        if not 0 <= percent <= 100:
+            raise ValueError(f"Invalid percentile '{aggregate}', expected p0 to p100")
+    elif aggregate not in AGGREGATES:
+        raise ValueError(f"Invalid aggregate '{aggregate}', expected one of: {', '.join(AGGREGATES)}")
+    if weight is not None and aggregate not in WEIGHTED:
+        raise ValueError(f"Only {' and '.join(WEIGHTED)} can be weighted")
+    return column, aggregate, weight
+
+def aggregate(index, aggregate, values, weights=None, sorted_column=None):
+    """One value per group of ``index``: the aggregate of ``values`` (float arrays with NaN for missing)
+
+    ``sorted_column`` may be a precomputed ``SortedColumn`` of ``values`` over
+    the same groups; otherwise one is built for the order statistics.
+    """
+    if aggregate == 'count':
+        return index.count(values)
+    if aggregate == 'sum':
+        return index.sum(values, weights)
+    if aggregate == 'mean':
+        return index.mean(values, weights)
+    if aggregate == 'std':
+        return index.std(values)
+
+    if aggregate == 'min':
+        q = 0.0
+    elif aggregate == 'max':
+        q = 1.0
+    elif aggregate == 'median':
+        q = 0.5
+    else:
+        q = float(aggregate[1:]) / 100
+    if sorted_column is None:
+        sorted_column = index.sorted_column(values)
+    result = np.full(index.n_groups, np.nan)
+    for group in range(index.n_groups):
+        group_values = sorted_column.values(group)
+        if len(group_values):
+            result[group] = quantiles(group_values, q)
+    return result
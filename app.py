@@ -1,43 +1,210 @@
-from flask import Flask, render_template, jsonify, request
+import time
+# Imported first so the startup report can time the remaining imports
+STARTUP_STARTED = time.perf_counter()
+
+import flask
+from flask import (Flask, jsonify, request, Response, stream_with_context, g,
+                   send_from_directory, has_request_context, abort)
+from werkzeug.security import safe_join
 import pandas as pd
 import numpy as np
 import os
+import sys
 import json
-import matplotlib
-matplotlib.use('Agg')  # Use non-interactive backend
-import matplotlib.pyplot as plt
-import seaborn as sns
-import io
-import base64
+import argparse
+import subprocess
 import shutil
+import hashlib
+import hmac
+import threading
+import zlib
+import mimetypes
+import multiprocessing
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+try:
+    import brotli
+except ImportError:  # Brotli is optional; responses fall back to gzip
+    brotli = None
+from gallery import Gallery
+from serialization import DataJSONProvider, json_values, json_records
+from metrics import Registry, SIZE_BUCKETS, phase
+from profiler import SamplingProfiler
+from histogram import STRATEGIES as HISTOGRAM_STRATEGIES, MAX_BINS as HISTOGRAM_MAX_BINS, SortedColumn, histogram
+from aggregate import GroupIndex, parse_metric, aggregate
+from regression import summarize_pairs
+from search import CountryIndex
+from correlation import METHODS as CORRELATION_METHODS, pairwise_correlation, correlation_tensor
+from datastore import (DATA_DIR, DATA_FILE, load_dataset, validate_dataset, quality_summary, load_cached_dataset,
+                       write_dataset_cache, file_signature, dataset_version)
+
+# Seconds spent in each startup phase, reported by `python app.py --startup-report`.
+# Matplotlib and seaborn are not imported here: plots.py loads them on first render.
+startup_timings = {'imports': time.perf_counter() - STARTUP_STARTED}
 
 app = Flask(__name__)
 
-# Custom JSON encoder to handle NaN values
-class CustomJSONEncoder(json.JSONEncoder):
-    def default(self, obj):
-        if isinstance(obj, (np.integer, np.floating, np.bool_)):
-            return obj.item()
-        if pd.isna(obj):
-            return None
-        if np.isinf(obj):
-            return None
-        return super().default(obj)
+# Key demographic variables shown in the correlation matrix
+DEMOGRAPHIC_VARS = ['Birthrate', 'Deathrate', 'Infant mortality', 'GDP']
 
-app.json_encoder = CustomJSONEncoder
+HISTOGRAM_BINS = 10
 
-# Try to load the data file
-try:
-    # Check if we need to copy the data file from professor provided folder
-    data_dir = os.path.join(os.path.dirname(__file__), 'data')
-    target_data_file = os.path.join(data_dir, 'country_data.csv')
+# Metrics /api/aggregate returns when none are requested
+DEFAULT_AGGREGATE_METRICS = ['Population:sum', 'Area:sum', 'GDP:mean:Population', 'Literacy:mean:Population']
+
+# Correlation matrices memoized per dataset version
+CORRELATION_MEMO_SIZE = 256
+
+# Rows encoded per chunk when streaming /api/countries
+STREAM_CHUNK_ROWS = 1000
+
+# Results of /api/search and /api/countries/<code>/similar: default and maximum
+SEARCH_LIMIT = 10
+MAX_SEARCH_LIMIT = 100
+
+# How often (in seconds) the background watcher checks whether the data file has changed
+STATS_CHECK_INTERVAL = float(os.environ.get('STATS_CHECK_INTERVAL', '2'))
+
+# Token required by the /admin/* routes (as "Authorization: Bearer <token>"); open if unset
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN')
+
+# Worker processes used to precompute the scatter pair summaries of large datasets
+PAIR_WORKERS = int(os.environ.get('PAIR_WORKERS', '2'))
+
+# How often (in seconds) the background watcher checks the visualization images for changes
+WATCH_INTERVAL = float(os.environ.get('WATCH_INTERVAL', '5'))
+
+# Rendered plots: worker processes, in-memory LRU size and on-disk location
+RENDER_WORKERS = int(os.environ.get('RENDER_WORKERS', '2'))
+RENDER_CACHE_SIZE = int(os.environ.get('RENDER_CACHE_SIZE', '64'))
+RENDER_CACHE_DIR = os.path.join(DATA_DIR, 'cache', 'renders')
+RENDER_TIMEOUT = 60
+
+# Send a Server-Timing header with each response's phase timings
+SERVER_TIMING = os.environ.get('SERVER_TIMING', '0').lower() in ('1', 'true', 'yes')
+
+# Write a sampled profile of requests slower than this many milliseconds (off if unset)
+PROFILE_SLOW_MS = os.environ.get('PROFILE_SLOW_MS')
+PROFILE_DIR = os.path.join(DATA_DIR, 'profiles')
+PROFILE_INTERVAL_MS = float(os.environ.get('PROFILE_INTERVAL_MS', '5'))
+
+# Cache-Control max-age (in seconds) for /api/* responses
+API_CACHE_MAX_AGE = int(os.environ.get('API_CACHE_MAX_AGE', '60'))
+
+# Smallest JSON response body (in bytes) worth compressing
+COMPRESS_MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE', '1024'))
+
+# ----- Request metrics -----
+
+metrics = Registry()
+request_duration = metrics.histogram('dashboard_request_duration_seconds',
+                                     'Time to handle a request, including sending a streamed body',
+                                     ['route', 'method', 'status'])
+request_phase = metrics.histogram('dashboard_request_phase_seconds',
+                                  'Time per request phase; compute is the rest of the request (mostly pandas and NumPy)',
+                                  ['route', 'phase'])
+response_size = metrics.histogram('dashboard_response_size_bytes', 'Response body size as sent',
+                                  ['route'], SIZE_BUCKETS)
+cache_requests = metrics.counter('dashboard_cache_requests', 'Cache lookups by cache and result (hit or miss)',
+                                 ['cache', 'result'])
+slow_profiles = metrics.counter('dashboard_slow_request_profiles', 'Profiles written for slow requests', ['route'])
+
+profiler = None
+if PROFILE_SLOW_MS:
+    profiler = SamplingProfiler(PROFILE_DIR, float(PROFILE_SLOW_MS) / 1000, PROFILE_INTERVAL_MS / 1000)
+
+def count_cache(cache, hit):
+    cache_requests.inc(cache=cache, result='hit' if hit else 'miss')
+
+class TimedJSONProvider(DataJSONProvider):
+    """The JSON provider, counting the time spent encoding as the serialize phase"""
     
+    def dumps(self, obj, **kwargs):
+        with phase('serialize'):
+            return super().dumps(obj, **kwargs)
+
+app.json = TimedJSONProvider(app)
+
+def render_template(template_name, **context):
+    """Flask's render_template, counting the time spent as the render phase"""
+    with phase('render'):
+        return flask.render_template(template_name, **context)
+
+def record_request(route, method, status, duration, size, phases, profile):
+    """Observe one finished request in the metrics (and write its profile if it was slow)"""
+    request_duration.observe(duration, route=route, method=method, status=status)
+    if size is not None:
+        response_size.observe(size, route=route)
+    phases = dict(phases, compute=max(0.0, duration - sum(phases.values())))
+    for name, seconds in phases.items():
+        request_phase.observe(seconds, route=route, phase=name)
+    if profile is not None and profiler.stop(profile, duration, f"{method} {route}") is not None:
+        slow_profiles.inc(route=route)
+
+def record_after_stream(chunks, finish):
+    """Pass a streamed body through, then call ``finish`` with the number of bytes sent"""
+    size = 0
+    try:
+        for chunk in chunks:
+            size += len(chunk)
+            yield chunk
+    finally:
+        close = getattr(chunks, 'close', None)
+        if close is not None:
+            close()
+        finish(size)
+
+@app.before_request
+def start_request_timer():
+    """Start timing the request (registered first, so it runs before the other hooks)"""
+    g.request_started = time.perf_counter()
+    g.phases = {}
+    if profiler is not None:
+        g.profile = profiler.start()
+
+@app.after_request
+def record_request_metrics(response):
+    """Record the request's duration, phases and size (registered first, so it runs after the other hooks)"""
+    started = g.get('request_started')
+    if started is None:
+        return response
+    route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+    method, status = request.method, response.status_code
+    phases, profile = g.phases, g.pop('profile', None)
+    
+    if response.is_streamed and not response.direct_passthrough:
+        # The body is produced as it's sent, so record once the last chunk is out
+        response.response = record_after_stream(
+            response.iter_encoded(),
+            lambda size: record_request(route, method, status, time.perf_counter() - started,
+                                        size, phases, profile))
+        response.headers.pop('Content-Length', None)
+        return response
+    
+    duration = time.perf_counter() - started
+    record_request(route, method, status, duration, response.content_length, phases, profile)
+    if SERVER_TIMING:
+        timings = dict(phases, compute=max(0.0, duration - sum(phases.values())), total=duration)
+        response.headers['Server-Timing'] = ', '.join(f"{name};dur={seconds * 1000:.2f}"
+                                                      for name, seconds in timings.items())
+    return response
+
+@app.teardown_request
+def stop_request_profile(exc):
+    # Requests that never reached record_request_metrics
+    profile = g.pop('profile', None)
+    if profile is not None:
+        profiler.stop(profile)
+
+def locate_data_file():
+    """Make sure the data file exists in our data directory and return its path"""
     # Create the data directory if it doesn't exist
-    if not os.path.exists(data_dir):
-        os.makedirs(data_dir)
+    if not os.path.exists(DATA_DIR):
+        os.makedirs(DATA_DIR)
     
     # Copy the file if it doesn't exist in our data directory
-    if not os.path.exists(target_data_file):
+    if not os.path.exists(DATA_FILE):
         # Attempt to find the data file in different potential locations
         possible_paths = [
             '../professor provided/country_data.csv',     # Relative to web_dashboard
@@ -58,65 +225,390 @@ try:
             raise FileNotFoundError("Could not find country_data.csv in any expected location")
         
         # Copy the file to our data directory
-        shutil.copyfile(source_data_file, target_data_file)
-        print(f"Copied data file from {source_data_file} to {target_data_file}")
+        shutil.copyfile(source_data_file, DATA_FILE)
+        print(f"Copied data file from {source_data_file} to {DATA_FILE}")
+    
+    return DATA_FILE
+
+def histogram_payload(counts, edges):
+    """Histogram payload (counts, rounded edges, labels and tallest bar) for bin counts and edges"""
+    counts = counts.tolist()
+    edges = [round(edge, 2) for edge in edges.tolist()]
+    labels = [f"{edges[i]}-{edges[i+1]}" for i in range(len(edges)-1)]
+    
+    # Find tallest bar
+    tallest_idx = int(np.argmax(counts))
+    
+    return {
+        "counts": counts,
+        "edges": edges,
+        "labels": labels,
+        "tallest_idx": tallest_idx,
+        "tallest_count": int(counts[tallest_idx]),
+        "tallest_lower": edges[tallest_idx],
+        "tallest_upper": edges[tallest_idx + 1]
+    }
+
+def category_counts(series):
+    """Value counts payload for a non-numeric column, most common value first"""
+    counts = series.dropna().astype(str).str.strip().value_counts()
+    if len(counts) == 0:
+        raise ValueError("No values to count")
+    return {
+        "categorical": True,
+        "counts": counts.tolist(),
+        "labels": counts.index.tolist(),
+        "tallest_idx": 0,
+        "tallest_count": int(counts.iloc[0]),
+        "tallest_label": counts.index[0]
+    }
+
+def histogram_params(args):
+    """Parse ?bins=, ?strategy= and ?log= into ``(bins, strategy, log)``, raising ValueError if invalid"""
+    strategy = args.get('strategy', 'width')
+    if strategy not in HISTOGRAM_STRATEGIES:
+        raise ValueError(f"Invalid strategy, expected one of: {', '.join(HISTOGRAM_STRATEGIES)}")
+    bins = args.get('bins')
+    if bins is not None and strategy in ('auto', 'fd', 'sturges'):
+        raise ValueError(f"The {strategy} strategy chooses the number of bins itself")
+    try:
+        bins = int(bins) if bins is not None else HISTOGRAM_BINS
+    except ValueError:
+        raise ValueError("bins must be an integer") from None
+    if not 1 <= bins <= HISTOGRAM_MAX_BINS:
+        raise ValueError(f"bins must be between 1 and {HISTOGRAM_MAX_BINS}")
+    log = args.get('log', '0').lower() in ('1', 'true', 'yes')
+    return bins, strategy, log
+
+def variable_histogram(stats, variable, bins=HISTOGRAM_BINS, strategy='width', log=False, region=None):
+    """Histogram payload for a numeric column from its pre-sorted values, optionally for one region"""
+    if (bins, strategy, log, region) == (HISTOGRAM_BINS, 'width', False, None):
+        # Only columns with data have one; the others fail below like any other request
+        payload = stats['histograms'].get(variable)
+        count_cache('histogram', payload is not None)
+        if payload is not None:
+            return payload
+    else:
+        count_cache('histogram', False)
+    group = None if region is None else stats['region_index'][region]
+    values = stats['sorted_columns'][variable].values(group)
+    return histogram_payload(*histogram(values, bins, strategy, log))
+
+def encode_json(obj):
+    """Compact JSON with sorted keys, matching jsonify's output
+    
+    Unlike ``app.json.dumps`` this isn't timed; callers time their own serialize phase.
+    """
+    return DataJSONProvider.dumps(app.json, obj, separators=(',', ':'))
+
+def stream_records(frame, fields, positions, response_format='json', chunk_rows=STREAM_CHUNK_ROWS):
+    """Yield the selected rows of ``frame`` as JSON text, one chunk of rows at a time
+    
+    ``response_format`` 'json' produces a single array, 'ndjson' one object per line.
+    Only one chunk of rows is held in memory at a time.
+    """
+    columns = frame.columns.get_indexer(fields)
+    if response_format == 'json':
+        yield '['
+    for start in range(0, len(positions), chunk_rows):
+        chunk = frame.iloc[positions[start:start + chunk_rows], columns]
+        with phase('serialize'):
+            if response_format == 'json':
+                # The chunk as one array, without its brackets
+                text = (',' if start else '') + encode_json(chunk)[1:-1]
+            else:
+                text = ''.join(encode_json(row) + '\n' for row in json_records(chunk))
+        yield text
+    if response_format == 'json':
+        yield ']\n'
+
+def build_stats(frame):
+    """Precompute the aggregates, histograms and correlations the pages and API serve"""
+    stats = {
+        'regions': [],
+        'countries_count': len(frame),
+        'total_population': "N/A",
+        'avg_gdp': "N/A",
+        'variables': frame.select_dtypes(include=[np.number]).columns.tolist(),
+        'non_null': {col: int(count) for col, count in frame.notna().sum().items()},
+        'histograms': {},
+        'sorted_columns': {},
+        'correlation': pd.DataFrame(),
+        'correlation_tensor': None,
+        'correlation_counts': None,
+        'correlation_memo': {},
+        'region_index': {},
+        'region_codes': np.full(len(frame), -1),
+        'group_indices': {},
+        'column_arrays': {col: frame[col].to_numpy() for col in frame.columns},
+        'pairs': None,
+        'country_index': None,
+        'pop_area_corr': "N/A",
+        'demographic_matrix': None,
+    }
+    
+    if 'Region' in frame.columns:
+        stats['regions'] = sorted(frame['Region'].dropna().unique().tolist())
+        # Index of each row's region in stats['regions'] (-1 if missing)
+        stats['region_codes'] = pd.Categorical(frame['Region'], categories=stats['regions']).codes
+        stats['region_index'] = {region.strip(): i for i, region in enumerate(stats['regions'])}
+        stats['group_indices']['Region'] = GroupIndex(stats['region_codes'], stats['region_index'])
+    
+    # Handle NaN values for Population sum
+    if 'Population' in frame.columns:
+        total_population = frame['Population'].dropna().sum()
+        if not pd.isna(total_population):
+            stats['total_population'] = f"{total_population:,.0f}"
+    
+    # Handle NaN values for GDP mean
+    if 'GDP' in frame.columns:
+        avg_gdp = frame['GDP'].dropna().mean()
+        if not pd.isna(avg_gdp):
+            stats['avg_gdp'] = f"${avg_gdp:,.2f}"
+    
+    # Sorted values of every numeric column (overall and per region) for binning on
+    # request, and the default histogram of every numeric column with data
+    for col in stats['variables']:
+        column = SortedColumn(frame[col].to_numpy(dtype=float), stats['region_codes'], len(stats['regions']))
+        stats['sorted_columns'][col] = column
+        if len(column.all) > 0:
+            stats['histograms'][col] = histogram_payload(*histogram(column.all))
+    
+    # Pearson correlation matrices (pairwise-complete observations) for all countries
+    # and for each region, so any variable subset or region is a lookup
+    if stats['variables']:
+        variables = stats['variables']
+        values = frame[variables].to_numpy(dtype=float)
+        stats['correlation_tensor'], stats['correlation_counts'] = correlation_tensor(
+            values, stats['region_codes'], len(stats['regions']))
+        stats['correlation'] = pd.DataFrame(stats['correlation_tensor'][0], index=variables, columns=variables)
+        
+        # Regression line, outliers and plot points of every scatter pair
+        stats['pairs'] = summarize_pairs(values, variables, workers=PAIR_WORKERS)
+    
+    # Code and name lookups, name search and nearest neighbours over the numeric columns
+    if 'Country' in frame.columns:
+        stats['country_index'] = CountryIndex(
+            frame['Country'], frame['Code'] if 'Code' in frame.columns else None,
+            frame[stats['variables']].to_numpy(dtype=float), stats['variables'])
+    corr = stats['correlation']
+    
+    # Default correlation for Population vs Area (NaN can happen with constant data)
+    if 'Population' in corr.columns and 'Area' in corr.columns:
+        pop_area_corr = corr.loc['Population', 'Area']
+        if not pd.isna(pop_area_corr):
+            stats['pop_area_corr'] = f"{pop_area_corr:.2f}"
+    
+    # Rounded demographic correlation matrix with NaN replaced by None
+    if all(var in corr.columns for var in DEMOGRAPHIC_VARS):
+        demo = corr.loc[DEMOGRAPHIC_VARS, DEMOGRAPHIC_VARS].round(2).astype(object)
+        stats['demographic_matrix'] = demo.where(demo.notna(), None).values.tolist()
+    
+    return stats
+
+def read_dataset(path, signature):
+    """Load the dataset from its columnar cache, falling back to parsing the CSV
+    
+    When the CSV has to be parsed, the cache is rebuilt for the next worker that
+    starts. Returns ``(frame, version, report)``, where the report is the
+    data-quality report from parsing the CSV.
+    """
+    cached = load_cached_dataset(path)
+    count_cache('dataset', cached is not None)
+    if cached is not None:
+        return cached
+    
+    version = dataset_version(path)
+    frame, report = load_dataset(path)
+    validate_dataset(frame)
+    for line in quality_summary(report):
+        print(f"Data quality: {line}")
+    try:
+        write_dataset_cache(frame, version, signature, report=report)
+    except OSError as e:
+        # The cache is optional (e.g. on a read-only filesystem)
+        print(f"Could not write data cache: {str(e)}")
+    return frame, version, report
+
+# A loaded dataset and everything derived from it. A reload builds a new
+# snapshot and swaps it in with one assignment, so requests that started on the
+# old snapshot finish against it. The frame and precomputed statistics are not
+# modified once published, but stats also holds per-snapshot memos
+# ('correlation_memo', 'group_indices') that request threads fill in on first use.
+Snapshot = namedtuple('Snapshot', ['frame', 'stats', 'version', 'loaded_at', 'load_seconds', 'quality'])
+
+def empty_snapshot():
+    frame = pd.DataFrame()
+    return Snapshot(frame, build_stats(frame), None, None, 0.0, None)
+
+class StatsCache:
+    """The current dataset snapshot, keyed on the data file's content hash.
     
-    # Load the dataset from our local copy
-    df = pd.read_csv(target_data_file)
+    ``refresh`` checks the file's mtime/size at most every ``check_interval``
+    seconds; when it changes and the content hash differs, the new file is
+    parsed, validated and indexed, then published as the current snapshot. If
+    that fails the previous snapshot stays current and the error is kept in
+    ``last_error``.
+    """
     
-    # Clean the data
-    # Replace infinities with NaN
-    df = df.replace([np.inf, -np.inf], np.nan)
+    def __init__(self, path, check_interval=STATS_CHECK_INTERVAL):
+        self.path = path
+        self.check_interval = check_interval
+        self.snapshot = empty_snapshot()
+        self.signature = None
+        self.last_error = None
+        self.reloads = 0
+        self._last_check = 0.0
+        self._lock = threading.Lock()
     
-    # Convert specific columns to numeric, coercing errors to NaN
-    numeric_columns = ['Population', 'Area', 'Pop. Density', 'Coastline', 'Net migration',
-                       'Infant mortality', 'GDP', 'Literacy', 'Phones', 'Arable', 'Crops',
-                       'Other', 'Climate', 'Birthrate', 'Deathrate', 'Agriculture', 
-                       'Industry', 'Service']
+    @property
+    def stats(self):
+        return self.snapshot.stats
     
-    for col in numeric_columns:
-        if col in df.columns:
-            df[col] = pd.to_numeric(df[col], errors='coerce')
+    @property
+    def version(self):
+        return self.snapshot.version
     
-    # For analysis, we don't want to fill NaN values with 0 as it skews statistics
-    # We'll handle NaN values in each route/function as needed
+    def load(self):
+        """Load the dataset and rebuild all statistics, returning the new snapshot"""
+        started = time.perf_counter()
+        signature = file_signature(self.path)
+        # Remember the file even if it fails to load, so it isn't retried until it changes
+        self.signature = signature
+        self._last_check = time.monotonic()
+        try:
+            frame, version, quality = read_dataset(self.path, signature)
+            stats = build_stats(frame)
+        except Exception as e:
+            self.last_error = str(e)
+            raise
+        self.snapshot = Snapshot(frame, stats, version, time.time(), time.perf_counter() - started, quality)
+        self.last_error = None
+        return self.snapshot
+    
+    def refresh(self):
+        """Reload if the data file changed; returns the new snapshot or None"""
+        now = time.monotonic()
+        if now - self._last_check < self.check_interval:
+            return None
+        with self._lock:
+            if now - self._last_check < self.check_interval:
+                return None
+            self._last_check = now
+            signature = file_signature(self.path)
+            if signature is None or signature == self.signature:
+                return None
+            if dataset_version(self.path) == self.version:
+                # Touched but not modified
+                self.signature = signature
+                return None
+            snapshot = self.load()
+            self.reloads += 1
+            return snapshot
+
+stats_cache = StatsCache(DATA_FILE)
+
+def current_snapshot():
+    """The dataset snapshot for this request, pinned on first use so a request never mixes two versions"""
+    if not has_request_context():
+        return stats_cache.snapshot
+    snapshot = g.get('snapshot')
+    if snapshot is None:
+        snapshot = g.snapshot = stats_cache.snapshot
+    return snapshot
+
+def current_stats():
+    """Return precomputed statistics for this request's dataset snapshot"""
+    return current_snapshot().stats
+
+def current_frame():
+    """Return the DataFrame of this request's dataset snapshot"""
+    return current_snapshot().frame
+
+def reload_dataset():
+    """Publish a new snapshot if the data file changed; returns True if it was reloaded"""
+    try:
+        snapshot = stats_cache.refresh()
+    except Exception as e:
+        # Keep serving the previous data if the new file can't be loaded
+        print(f"Error reloading data: {str(e)}")
+        return False
+    if snapshot is None:
+        return False
+    print(f"Reloaded data from {DATA_FILE} (version {snapshot.version}) in {snapshot.load_seconds:.2f}s")
+    return True
+
+# Try to load the data file
+phase_started = time.perf_counter()
+try:
+    locate_data_file()
     
-    print(f"Loaded data from {target_data_file}")
-    print(f"Dataset shape: {df.shape}")
+    # Load the dataset from our local copy and precompute its statistics
+    snapshot = stats_cache.load()
+    
+    print(f"Loaded data from {DATA_FILE}")
+    print(f"Dataset shape: {snapshot.frame.shape}")
     
 except Exception as e:
+    # Serve an empty dataset; the watcher loads the file once it is fixed, and
+    # /admin/dataset reports the error in the meantime
     print(f"Error loading data: {str(e)}")
-    df = pd.DataFrame()  # Create empty DataFrame if loading fails
+startup_timings['data_load'] = time.perf_counter() - phase_started
+
+# Gallery manifest for /visualizations, built once here and refreshed in the background
+phase_started = time.perf_counter()
+gallery = Gallery(os.path.join(app.static_folder, 'visualizations'))
+try:
+    gallery.refresh()
+except Exception as e:
+    print(f"Error building gallery: {str(e)}")
+startup_timings['gallery'] = time.perf_counter() - phase_started
+
+# Functions the background watcher calls, each with how often (in seconds) to call it
+watched_refreshers = [(WATCH_INTERVAL, gallery.refresh), (STATS_CHECK_INTERVAL, reload_dataset)]
+watcher_pid = None
+watcher_lock = threading.Lock()
+
+def run_watcher():
+    """Background loop that keeps in-memory indexes in sync with files on disk"""
+    due = [time.monotonic() + interval for interval, _ in watched_refreshers]
+    while True:
+        time.sleep(max(0.0, min(due) - time.monotonic()))
+        for i, (interval, refresh) in enumerate(watched_refreshers):
+            if time.monotonic() < due[i]:
+                continue
+            try:
+                refresh()
+            except Exception as e:
+                print(f"Error in background refresh: {str(e)}")
+            due[i] = time.monotonic() + interval
+
+def ensure_watcher():
+    """Start the background watcher once per process (threads don't survive a fork)"""
+    global watcher_pid
+    if watcher_pid == os.getpid():
+        return
+    with watcher_lock:
+        if watcher_pid != os.getpid():
+            threading.Thread(target=run_watcher, name='file-watcher', daemon=True).start()
+            watcher_pid = os.getpid()
+
+@app.before_request
+def start_watcher():
+    """Start this worker's background watcher on its first request"""
+    ensure_watcher()
 
 @app.route('/')
 def index():
     """Render the home page"""
     try:
-        # Get list of regions for the dashboard filters
-        regions = sorted(df['Region'].dropna().unique().tolist())
-        
-        # Get some basic stats
-        countries_count = len(df)
-        
-        # Handle NaN values for Population sum
-        total_population = df['Population'].dropna().sum()
-        if pd.isna(total_population):
-            total_population_str = "N/A"
-        else:
-            total_population_str = f"{total_population:,.0f}"
-        
-        # Handle NaN values for GDP mean
-        avg_gdp = df['GDP'].dropna().mean()
-        if pd.isna(avg_gdp):
-            avg_gdp_str = "N/A"
-        else:
-            avg_gdp_str = f"${avg_gdp:,.2f}"
+        stats = current_stats()
         
         return render_template('index.html', 
-                              regions=regions,
-                              countries_count=countries_count,
-                              total_population=total_population_str,
-                              avg_gdp=avg_gdp_str)
+                              regions=stats['regions'],
+                              countries_count=stats['countries_count'],
+                              total_population=stats['total_population'],
+                              avg_gdp=stats['avg_gdp'])
     except Exception as e:
         return render_template('index.html', 
                               error=str(e),
@@ -127,46 +619,47 @@ def index():
 
 @app.route('/histograms')
 def histograms():
-    """Render the histograms page"""
+    """Render the histograms page (accepts the same ?bins=, ?strategy=, ?log= and ?region= as the API)"""
+    no_data = dict(birth_counts=[],
+                   birth_labels=[],
+                   birth_tallest_count=0,
+                   birth_tallest_lower=0,
+                   birth_tallest_upper=0,
+                   lit_counts=[],
+                   lit_labels=[],
+                   lit_tallest_count=0,
+                   lit_tallest_lower=0,
+                   lit_tallest_upper=0)
     try:
+        stats = current_stats()
+        bins, strategy, log = histogram_params(request.args)
+        region = request.args.get('region')
+        if region is not None:
+            region = region.strip()
+            if region not in stats['region_index']:
+                raise ValueError("Invalid region")
+        
         # Handle the case where there is not enough data
-        if len(df['Birthrate'].dropna()) < 2 or len(df['Literacy'].dropna()) < 2:
+        if stats['non_null'].get('Birthrate', 0) < 2 or stats['non_null'].get('Literacy', 0) < 2:
             return render_template('histograms.html', 
                                   error="Not enough data to generate histograms",
-                                  birth_counts=[],
-                                  birth_labels=[],
-                                  birth_tallest_count=0,
-                                  birth_tallest_lower=0,
-                                  birth_tallest_upper=0,
-                                  lit_counts=[],
-                                  lit_labels=[],
-                                  lit_tallest_count=0,
-                                  lit_tallest_lower=0,
-                                  lit_tallest_upper=0)
-        
-        # Generate histogram data for Birthrate
-        birthrate_hist = np.histogram(df['Birthrate'].dropna(), bins=10)
-        birth_counts = birthrate_hist[0].tolist()
-        birth_edges = [round(edge, 2) for edge in birthrate_hist[1].tolist()]
-        birth_labels = [f"{birth_edges[i]}-{birth_edges[i+1]}" for i in range(len(birth_edges)-1)]
-        
-        # Find tallest bar for birthrate
-        birth_tallest_idx = np.argmax(birth_counts)
-        birth_tallest_count = int(birth_counts[birth_tallest_idx])
-        birth_tallest_lower = birth_edges[birth_tallest_idx]
-        birth_tallest_upper = birth_edges[birth_tallest_idx + 1]
-        
-        # Generate histogram data for Literacy
-        literacy_hist = np.histogram(df['Literacy'].dropna(), bins=10)
-        lit_counts = literacy_hist[0].tolist()
-        lit_edges = [round(edge, 2) for edge in literacy_hist[1].tolist()]
-        lit_labels = [f"{lit_edges[i]}-{lit_edges[i+1]}" for i in range(len(lit_edges)-1)]
-        
-        # Find tallest bar for literacy
-        lit_tallest_idx = np.argmax(lit_counts)
-        lit_tallest_count = int(lit_counts[lit_tallest_idx])
-        lit_tallest_lower = lit_edges[lit_tallest_idx]
-        lit_tallest_upper = lit_edges[lit_tallest_idx + 1]
+                                  **no_data)
+        
+        # Histogram data for Birthrate
+        birth_hist = variable_histogram(stats, 'Birthrate', bins, strategy, log, region)
+        birth_counts = birth_hist['counts']
+        birth_labels = birth_hist['labels']
+        birth_tallest_count = birth_hist['tallest_count']
+        birth_tallest_lower = birth_hist['tallest_lower']
+        birth_tallest_upper = birth_hist['tallest_upper']
+        
+        # Histogram data for Literacy
+        lit_hist = variable_histogram(stats, 'Literacy', bins, strategy, log, region)
+        lit_counts = lit_hist['counts']
+        lit_labels = lit_hist['labels']
+        lit_tallest_count = lit_hist['tallest_count']
+        lit_tallest_lower = lit_hist['tallest_lower']
+        lit_tallest_upper = lit_hist['tallest_upper']
         
         return render_template('histograms.html',
                               birth_counts=birth_counts,
@@ -180,46 +673,25 @@ def histograms():
                               lit_tallest_lower=lit_tallest_lower,
                               lit_tallest_upper=lit_tallest_upper)
     except Exception as e:
-        return render_template('histograms.html', error=str(e))
+        return render_template('histograms.html', error=str(e), **no_data)
 
 @app.route('/scatter')
 def scatter():
     """Render the scatter plots page"""
     try:
-        # Get list of numeric variables for dropdowns
-        variables = df.select_dtypes(include=[np.number]).columns.tolist()
-        
-        # Calculate default correlation for Population vs Area
-        pop_area_df = df[['Population', 'Area']].dropna()
-        pop_area_corr = None
-        if len(pop_area_df) >= 2:
-            pop_area_corr = pop_area_df.corr().iloc[0, 1]
-            # Check if correlation is NaN (can happen with constant data)
-            if pd.isna(pop_area_corr):
-                pop_area_corr = None
-        
-        pop_area_corr_str = "N/A" if pop_area_corr is None else f"{pop_area_corr:.2f}"
-        
-        # Default key demographic variables
-        demographic_vars = ['Birthrate', 'Deathrate', 'Infant mortality', 'GDP']
-        
-        # Calculate correlation matrix for these variables
-        correlation_matrix = df[demographic_vars].corr().round(2)
-        
-        # Replace NaN with None for template rendering
-        correlation_dict = {}
-        for var1 in demographic_vars:
-            correlation_dict[var1] = {}
-            for var2 in demographic_vars:
-                value = correlation_matrix.loc[var1, var2]
-                if pd.isna(value):
-                    correlation_dict[var1][var2] = None
-                else:
-                    correlation_dict[var1][var2] = value
+        stats = current_stats()
+        
+        # Default key demographic variables and their correlation matrix
+        demographic_vars = DEMOGRAPHIC_VARS
+        matrix = stats['demographic_matrix']
+        if matrix is None:
+            raise KeyError(f"Missing demographic variables: {demographic_vars}")
+        correlation_dict = {var1: dict(zip(demographic_vars, row))
+                            for var1, row in zip(demographic_vars, matrix)}
         
         return render_template('scatter.html',
-                              variables=variables,
-                              pop_area_corr=pop_area_corr_str,
+                              variables=stats['variables'],
+                              pop_area_corr=stats['pop_area_corr'],
                               demographic_vars=demographic_vars,
                               correlation_matrix=correlation_dict)
     except Exception as e:
@@ -229,254 +701,583 @@ def scatter():
 def visualizations():
     """Route to display static visualizations generated by generate_plots.py"""
     try:
-        # Path to static visualization directory in our web app
-        static_folder = os.path.join(os.path.dirname(__file__), 'static', 'visualizations')
-        os.makedirs(static_folder, exist_ok=True)
-        
-        # Alternative paths to find the visualization images
-        possible_paths = [
-            os.path.join(os.path.dirname(os.path.dirname(__file__)), 'static_visualizations', 'output_images'),
-            os.path.join(os.path.dirname(os.path.dirname(__file__)), 'plots'),
-            os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'plots')
-        ]
-        
-        # Find all available images from all possible locations
-        image_files = []
-        source_paths = {}
-        
-        # Check if we already have images in our static directory
-        if os.path.exists(static_folder):
-            for file in os.listdir(static_folder):
-                if file.endswith('.png'):
-                    image_files.append(file)
-        
-        # If we don't have images in static directory, check other locations
-        if not image_files:
-            for path in possible_paths:
-                if os.path.exists(path):
-                    for file in os.listdir(path):
-                        if file.endswith('.png') and file not in image_files:
-                            image_files.append(file)
-                            source_paths[file] = os.path.join(path, file)
-            
-            # Copy newly found images to the static folder
-            for img, src_path in source_paths.items():
-                dst = os.path.join(static_folder, img)
-                try:
-                    shutil.copyfile(src_path, dst)
-                    print(f"Copied {img} to {dst}")
-                except Exception as e:
-                    print(f"Error copying {img}: {str(e)}")
-        
-        # Create visualization data with descriptions
-        # Regional visualizations
-        regional_visualizations = []
-        for img in image_files:
-            if 'by_region' in img or 'region' in img:
-                title = img.replace('_', ' ').replace('.png', '').replace('by region', '- Regional Analysis').title()
-                
-                # Create descriptive text based on image content
-                description = ""
-                if 'gdp_population' in img:
-                    description = "This visualization shows the relationship between GDP and population across different regions. Each point represents a country, with colors indicating different geographical regions."
-                elif 'gdp_literacy' in img:
-                    description = "Comparing GDP and literacy rates with region-based coloring. The plot reveals economic and educational patterns across different geographical areas."
-                elif 'birthrate' in img and 'histogram' in img:
-                    description = "Distribution of birthrates shown by region. The histogram displays how birthrates vary across different geographical areas."
-                elif 'Birthrate_vs_' in img or '_vs_Birthrate' in img:
-                    description = "Correlation between birthrate and other demographic indicators, color-coded by region to highlight geographic patterns."
-                elif 'economic_sectors' in img:
-                    description = "Breakdown of economic sectors (Agriculture, Industry, Service) by region, showing regional economic specialization patterns."
-                elif 'population_area' in img:
-                    description = "Relationship between country population and land area, colored by region to reveal geographic patterns in population density."
-                else:
-                    description = "Regional analysis showing how patterns differ across geographic regions. The visualization uses color-coding to distinguish between different parts of the world."
-                
-                regional_visualizations.append({
-                    'title': title,
-                    'image_path': f"/static/visualizations/{img}",
-                    'description': description
-                })
-        
-        # Distribution visualizations
-        distribution_visualizations = []
-        for img in image_files:
-            if ('histogram' in img or 'distribution' in img) and 'by_region' not in img and 'region' not in img:
-                title = img.replace('_', ' ').replace('.png', '').title()
-                
-                description = ""
-                if 'birthrate' in img:
-                    description = "Distribution of birthrates across countries. This histogram shows how many countries fall into different birthrate ranges."
-                elif 'literacy' in img:
-                    description = "Distribution of literacy rates globally. The histogram reveals educational attainment patterns across countries."
-                elif 'population' in img:
-                    description = "Population distribution showing how country populations are distributed across different size categories."
-                else:
-                    description = "Statistical distribution showing how countries are distributed across different value ranges for this demographic indicator."
-                    
-                distribution_visualizations.append({
-                    'title': title,
-                    'image_path': f"/static/visualizations/{img}",
-                    'description': description
-                })
-        
-        # Correlation visualizations
-        correlation_visualizations = []
-        for img in image_files:
-            if ('correlation' in img or ('_vs_' in img and 'by_region' not in img and 'region' not in img)):
-                title = img.replace('_', ' ').replace('.png', '').title()
-                
-                description = ""
-                if 'correlation_matrix' in img:
-                    description = "Correlation matrix showing relationships between key demographic variables. Darker colors indicate stronger correlations."
-                elif 'Birthrate_vs_Infant' in img or 'Infant_vs_Birthrate' in img:
-                    description = "Relationship between birthrate and infant mortality. This scatter plot reveals how these two health indicators are connected."
-                elif 'GDP_vs_' in img or '_vs_GDP' in img:
-                    description = "Correlation between GDP and another demographic indicator, revealing economic relationships."
-                elif '_vs_' in img:
-                    # Extract the two variables being compared
-                    parts = img.split('_vs_')
-                    if len(parts) > 1:
-                        var1 = parts[0].replace('_', ' ').title()
-                        var2 = parts[1].split('_')[0].replace('_', ' ').title()
-                        description = f"Correlation analysis between {var1} and {var2}, showing how these two indicators relate to each other across countries."
-                else:
-                    description = "Correlation analysis revealing relationships between demographic indicators."
-                    
-                correlation_visualizations.append({
-                    'title': title,
-                    'image_path': f"/static/visualizations/{img}",
-                    'description': description
-                })
-        
-        # For a better user experience, ensure we have at least some items in each category
-        if not regional_visualizations and (distribution_visualizations or correlation_visualizations):
-            # Move some items to regional if empty
-            for i, viz in enumerate(correlation_visualizations):
-                if 'region' in viz['title'].lower() or 'regional' in viz['title'].lower():
-                    regional_visualizations.append(viz)
-                    correlation_visualizations.pop(i)
-                    break
-            
-        if not distribution_visualizations and (regional_visualizations or correlation_visualizations):
-            # Create a generic entry if we have no distributions
-            distribution_visualizations.append({
-                'title': 'Statistical Distributions',
-                'image_path': regional_visualizations[0]['image_path'] if regional_visualizations else correlation_visualizations[0]['image_path'],
-                'description': 'Statistical distributions showing how countries are distributed across different demographic indicators.'
-            })
-        
-        if not correlation_visualizations and (regional_visualizations or distribution_visualizations):
-            # Create a generic entry if we have no correlations
-            correlation_visualizations.append({
-                'title': 'Variable Correlations',
-                'image_path': regional_visualizations[0]['image_path'] if regional_visualizations else distribution_visualizations[0]['image_path'],
-                'description': 'Correlation analysis showing relationships between different country indicators.'
-            })
-            
+        manifest = gallery.manifest
         return render_template('visualizations.html',
-                            regional_visualizations=regional_visualizations,
-                            distribution_visualizations=distribution_visualizations,
-                            correlation_visualizations=correlation_visualizations)
+                            regional_visualizations=manifest['regional'],
+                            distribution_visualizations=manifest['distribution'],
+                            correlation_visualizations=manifest['correlation'])
     except Exception as e:
         print(f"Error in visualizations route: {str(e)}")
         return render_template('visualizations.html', error=str(e))
 
+# ----- Response compression -----
+
+def accepted_encoding():
+    """Best content encoding the client accepts: 'br', 'gzip' or None"""
+    if brotli is not None and request.accept_encodings['br'] > 0:
+        return 'br'
+    if request.accept_encodings['gzip'] > 0:
+        return 'gzip'
+    return None
+
+class StreamCompressor:
+    """Incremental gzip or brotli compressor with the same interface for both"""
+    
+    def __init__(self, encoding, level=6):
+        self.encoding = encoding
+        if encoding == 'br':
+            self._compressor = brotli.Compressor(quality=min(level, 11))
+        else:
+            self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # 31: gzip container
+    
+    def compress(self, data):
+        """Compress ``data`` and flush, so each chunk can be sent right away"""
+        if self.encoding == 'br':
+            return self._compressor.process(data) + self._compressor.flush()
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+    
+    def finish(self):
+        if self.encoding == 'br':
+            return self._compressor.finish()
+        return self._compressor.flush()
+
+def compress_chunks(chunks, encoding):
+    compressor = StreamCompressor(encoding)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.finish()
+
+def compress_response(response):
+    """Compress a JSON response body with the best encoding the client accepts"""
+    if response.mimetype not in ('application/json', 'application/x-ndjson'):
+        return response
+    response.vary.add('Accept-Encoding')
+    encoding = accepted_encoding()
+    if encoding is None or 'Content-Encoding' in response.headers:
+        return response
+    
+    if response.is_streamed:
+        # Compress chunk by chunk so the response keeps streaming
+        response.response = compress_chunks(response.iter_encoded(), encoding)
+        response.headers.pop('Content-Length', None)
+    else:
+        body = response.get_data()
+        if len(body) < COMPRESS_MIN_SIZE:
+            return response
+        compressor = StreamCompressor(encoding)
+        response.set_data(compressor.compress(body) + compressor.finish())
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+# ----- Precompressed static assets -----
+
+# Precompressed siblings written by build_static.py, best first
+STATIC_ENCODINGS = [('.br', 'br'), ('.gz', 'gzip')]
+
+# Image variants written by build_static.py, best first
+IMAGE_VARIANTS = [('.avif', 'image/avif'), ('.webp', 'image/webp')]
+
+def static_mtime(filename):
+    """Modification time of a file under the static folder, or None if there's no such file"""
+    path = safe_join(app.static_folder, filename)
+    if path is None or not os.path.isfile(path):
+        return None
+    return os.path.getmtime(path)
+
+def fresh_variants(filename, candidates):
+    """The ``(variant, value)`` candidates that exist and are at least as new as ``filename``
+
+    Checked on each request, like build_static.is_fresh, so a source edited
+    since the last build is served as is rather than from a stale copy.
+    """
+    source = static_mtime(filename)
+    if source is None:
+        return []
+    fresh = []
+    for variant, value in candidates:
+        mtime = static_mtime(variant)
+        if mtime is not None and mtime >= source:
+            fresh.append((variant, value))
+    return fresh
+
+def is_generated_variant(filename):
+    """True if ``filename`` is a sibling build_static.py wrote for another static file"""
+    lower = filename.lower()
+    for suffix, _ in STATIC_ENCODINGS:
+        if lower.endswith(suffix) and static_mtime(filename[:-len(suffix)]) is not None:
+            return True
+    for ext, _ in IMAGE_VARIANTS:
+        if lower.endswith(ext) and static_mtime(filename[:-len(ext)] + '.png') is not None:
+            return True
+    return False
+
+def send_static(filename):
+    """Serve a static file, preferring a precompressed copy or smaller image format the client accepts"""
+    # Variants are only served through their source's URL, with the right headers
+    if is_generated_variant(filename):
+        abort(404)
+    max_age = app.get_send_file_max_age(filename)
+    
+    if filename.lower().endswith('.png'):
+        base = filename[:-4]
+        variants = fresh_variants(filename, [(base + ext, mimetype) for ext, mimetype in IMAGE_VARIANTS])
+        if variants:
+            # Only use formats the client names explicitly, not via */*
+            accepted = {value for value, quality in request.accept_mimetypes if quality > 0}
+            for variant, mimetype in variants:
+                if mimetype in accepted:
+                    response = send_from_directory(app.static_folder, variant, max_age=max_age)
+                    break
+            else:
+                response = send_from_directory(app.static_folder, filename, max_age=max_age)
+            response.vary.add('Accept')
+            return response
+    
+    encodings = fresh_variants(filename, [(filename + suffix, encoding) for suffix, encoding in STATIC_ENCODINGS])
+    if encodings:
+        for variant, encoding in encodings:
+            if request.accept_encodings[encoding] > 0:
+                response = send_from_directory(app.static_folder, variant, max_age=max_age,
+                                               mimetype=mimetypes.guess_type(filename)[0])
+                response.headers['Content-Encoding'] = encoding
+                break
+        else:
+            response = send_from_directory(app.static_folder, filename, max_age=max_age)
+        response.vary.add('Accept-Encoding')
+        return response
+    
+    return send_from_directory(app.static_folder, filename, max_age=max_age)
+
+app.view_functions['static'] = send_static
+
+# ----- HTTP caching for API routes -----
+
+def api_etag():
+    """Strong ETag for the current request: dataset version plus path and query arguments"""
+    version = current_snapshot().version
+    if version is None:
+        return None
+    args = '&'.join(f"{key}={value}" for key, value in sorted(request.args.items(multi=True)))
+    digest = hashlib.sha1(f"{request.path}?{args}".encode('utf-8')).hexdigest()[:16]
+    return f"{version}-{digest}"
+
+def set_cache_headers(response, etag, encoding=None):
+    if encoding:
+        # Each encoding is a different representation, so it needs its own tag
+        etag = f"{etag}-{encoding}"
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = f"public, max-age={API_CACHE_MAX_AGE}"
+    return response
+
+@app.before_request
+def api_conditional_get():
+    """Answer repeat API requests with 304 Not Modified before any pandas work runs"""
+    if not request.path.startswith('/api/') or request.method not in ('GET', 'HEAD'):
+        return None
+    etag = g.api_etag = api_etag()
+    if etag is None:
+        return None
+    for encoding in (None, 'gzip', 'br'):
+        if request.if_none_match.contains_weak(f"{etag}-{encoding}" if encoding else etag):
+            count_cache('http', True)
+            response = app.response_class(status=304)
+            response.vary.add('Accept-Encoding')
+            return set_cache_headers(response, etag, encoding)
+    count_cache('http', False)
+    return None
+
+@app.after_request
+def api_response_headers(response):
+    """Compress successful API responses and add ETag and Cache-Control headers"""
+    if response.status_code == 200 and request.path.startswith('/api/'):
+        with phase('compress'):
+            compress_response(response)
+        # Set by api_conditional_get, so the tag matches the data the response was built from
+        etag = g.get('api_etag')
+        if etag is not None:
+            set_cache_headers(response, etag, response.headers.get('Content-Encoding'))
+    return response
+
 # ----- API Routes for Data Access -----
 
 @app.route('/api/countries')
 def get_countries():
-    """API route to get all country data"""
+    """API route to get country data, streamed in chunks of rows
+    
+    Query parameters:
+    - fields: comma-separated columns to include (default: all)
+    - region: only include countries in this region
+    - limit, offset: page through the (filtered) rows
+    - format: 'json' (default, an array of objects) or 'ndjson' (one object per line)
+    """
     try:
-        # Convert to records and clean any NaN values
-        countries = [{k: (None if pd.isna(v) else v) for k, v in record.items()} 
-                     for record in df.to_dict(orient='records')]
-        return jsonify(countries)
+        stats = current_stats()
+        # Stream from this request's snapshot, even if the data reloads mid-response
+        frame = current_frame()
+        
+        fields = request.args.get('fields')
+        if fields:
+            fields = list(dict.fromkeys(field.strip() for field in fields.split(',') if field.strip()))
+            unknown = [field for field in fields if field not in frame.columns]
+            if unknown:
+                return jsonify({"error": f"Invalid fields: {', '.join(unknown)}"}), 400
+        else:
+            fields = frame.columns.tolist()
+        
+        response_format = request.args.get('format', 'json')
+        if response_format not in ('json', 'ndjson'):
+            return jsonify({"error": "Invalid format, expected 'json' or 'ndjson'"}), 400
+        
+        try:
+            offset = int(request.args.get('offset', 0))
+            limit = request.args.get('limit')
+            limit = None if limit is None else int(limit)
+        except ValueError:
+            return jsonify({"error": "limit and offset must be integers"}), 400
+        if offset < 0 or (limit is not None and limit < 0):
+            return jsonify({"error": "limit and offset must not be negative"}), 400
+        
+        # Row positions to return, after filtering and pagination
+        region = request.args.get('region')
+        if region is not None:
+            region = region.strip()
+            if region not in stats['region_index']:
+                return jsonify({"error": "Invalid region"}), 400
+            positions = stats['group_indices']['Region'].rows(stats['region_index'][region])
+        else:
+            positions = np.arange(len(frame))
+        total = len(positions)
+        positions = positions[offset:] if limit is None else positions[offset:offset + limit]
+        
+        response = Response(stream_with_context(stream_records(frame, fields, positions, response_format)),
+                            mimetype='application/x-ndjson' if response_format == 'ndjson' else 'application/json')
+        response.headers['X-Total-Count'] = str(total)
+        return response
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+def country_record(stats, row, fields):
+    """One row as a dict of ``fields``, from the columns extracted at load"""
+    return {field: stats['column_arrays'][field][row] for field in fields}
+
+def limit_param(args, name, default):
+    """A positive integer query parameter, capped at MAX_SEARCH_LIMIT (ValueError if invalid)"""
+    value = int(args.get(name, default))
+    if value < 1:
+        raise ValueError(f"{name} must be a positive integer")
+    return min(value, MAX_SEARCH_LIMIT)
+
+@app.route('/api/countries/<code>')
+def get_country(code):
+    """API route to get one country by its code (e.g. 'FRA') or, failing that, its name
+    
+    Query parameters:
+    - fields: comma-separated columns to include (default: all)
+    """
+    try:
+        stats = current_stats()
+        index = stats['country_index']
+        row = None if index is None else index.lookup(code)
+        if row is None:
+            return jsonify({"error": "Country not found"}), 404
+        
+        columns = list(stats['column_arrays'])
+        fields = request.args.get('fields')
+        if fields:
+            fields = list(dict.fromkeys(field.strip() for field in fields.split(',') if field.strip()))
+            unknown = [field for field in fields if field not in columns]
+            if unknown:
+                return jsonify({"error": f"Invalid fields: {', '.join(unknown)}"}), 400
+        else:
+            fields = columns
+        return jsonify(country_record(stats, row, fields))
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/countries/<code>/similar')
+def get_similar_countries(code):
+    """API route to get the countries most similar to one, by distance over standardized numeric columns
+    
+    Query parameters:
+    - k: number of countries to return (default 10, at most 100)
+    - features: comma-separated numeric columns to compare (default: all)
+    """
+    try:
+        stats = current_stats()
+        index = stats['country_index']
+        row = None if index is None else index.lookup(code)
+        if row is None:
+            return jsonify({"error": "Country not found"}), 404
+        
+        try:
+            k = limit_param(request.args, 'k', SEARCH_LIMIT)
+        except ValueError:
+            return jsonify({"error": "k must be a positive integer"}), 400
+        features = request.args.get('features')
+        if features:
+            features = list(dict.fromkeys(feature.strip() for feature in features.split(',') if feature.strip()))
+            unknown = [feature for feature in features if feature not in stats['variables']]
+            if unknown:
+                return jsonify({"error": f"Invalid features: {', '.join(unknown)}"}), 400
+        else:
+            features = stats['variables']
+        
+        rows, distances = index.similar(row, k, features)
+        summary_fields = [field for field in ('Country', 'Code', 'Region') if field in stats['column_arrays']]
+        similar = [dict(country_record(stats, r, summary_fields), distance=round(float(d), 4))
+                   for r, d in zip(rows.tolist(), distances.tolist())]
+        return jsonify({
+            "country": country_record(stats, row, summary_fields),
+            "features": features,
+            "similar": similar
+        })
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/search')
+def search_countries():
+    """API route to find countries by code or name
+    
+    Query parameters:
+    - q: the text to search for (required)
+    - limit: number of results (default 10, at most 100)
+    
+    Results are ordered by how they matched: an exact code or name first, then
+    names starting with q, then names with a word starting with q, then names
+    spelled similarly to q. Case, accents and extra spaces are ignored.
+    """
+    try:
+        query = request.args.get('q', '').strip()
+        if not query:
+            return jsonify({"error": "Missing search query q"}), 400
+        try:
+            limit = limit_param(request.args, 'limit', SEARCH_LIMIT)
+        except ValueError:
+            return jsonify({"error": "limit must be a positive integer"}), 400
+        
+        stats = current_stats()
+        index = stats['country_index']
+        matches = {}
+        if index is not None:
+            row = index.lookup(query)
+            if row is not None:
+                matches[row] = ('exact', 1.0)
+            for row in index.prefix(query, limit):
+                matches.setdefault(row, ('prefix', round(len(query) / max(len(index.names[row]), 1), 4)))
+            if len(matches) < limit:
+                rows, scores = index.fuzzy(query, limit)
+                for row, score in zip(rows.tolist(), scores.tolist()):
+                    matches.setdefault(row, ('fuzzy', round(score, 4)))
+        
+        summary_fields = [field for field in ('Country', 'Code', 'Region') if field in stats['column_arrays']]
+        results = [dict(country_record(stats, row, summary_fields), match=match, score=score)
+                   for row, (match, score) in list(matches.items())[:limit]]
+        return jsonify({"query": query, "results": results})
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 @app.route('/api/histogram/<variable>')
 def get_histogram_data(variable):
-    """API route to get histogram data for a specific variable"""
+    """API route to get histogram data for a specific variable
+    
+    Optional query parameters:
+    - bins: number of bins (default 10; for the width and quantile strategies)
+    - strategy: width (equal-width bins, the default), auto, fd, sturges or quantile
+    - log: 1 to bin numeric values on a log10 scale
+    - region: only count countries in this region
+    
+    Non-numeric columns return the count of each value instead.
+    """
     try:
+        stats = current_stats()
+        df = current_frame()
         if variable not in df.columns:
             return jsonify({"error": "Invalid variable name"}), 400
-            
-        # Generate histogram data
-        hist_data = np.histogram(df[variable].dropna(), bins=10)
-        counts = hist_data[0].tolist()
-        edges = [round(edge, 2) for edge in hist_data[1].tolist()]
-        labels = [f"{edges[i]}-{edges[i+1]}" for i in range(len(edges)-1)]
         
-        # Find tallest bar
-        tallest_idx = np.argmax(counts)
+        region = request.args.get('region')
+        if region is not None:
+            region = region.strip()
+            if region not in stats['region_index']:
+                return jsonify({"error": "Invalid region"}), 400
         
-        return jsonify({
-            "counts": counts,
-            "edges": edges,
-            "labels": labels,
-            "tallest_idx": int(tallest_idx),
-            "tallest_count": int(counts[tallest_idx]),
-            "tallest_lower": edges[tallest_idx],
-            "tallest_upper": edges[tallest_idx + 1]
-        })
+        if variable not in stats['variables']:
+            values = df[variable]
+            if region is not None:
+                values = values[stats['region_codes'] == stats['region_index'][region]]
+            try:
+                return jsonify(category_counts(values))
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+        
+        try:
+            bins, strategy, log = histogram_params(request.args)
+            hist = variable_histogram(stats, variable, bins, strategy, log, region)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        
+        return jsonify(hist)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+def pair_summary(stats, x_var, y_var, correlation):
+    """Regression of y on x, its fit and its outliers, from the precomputed pair table"""
+    pairs = stats['pairs']
+    arrays = stats['column_arrays']
+    count, slope, intercept, residual_std = pairs.fit(x_var, y_var)
+    rows = pairs.outliers(x_var, y_var)
+    outliers = {col: arrays[col][rows] for col in dict.fromkeys(['Country', 'Region', x_var, y_var])}
+    outliers['residual'] = arrays[y_var][rows] - (intercept + slope * arrays[x_var][rows])
+    return {
+        "count": count,
+        "correlation": correlation,
+        "r2": None if correlation is None else correlation ** 2,
+        "slope": slope,
+        "intercept": intercept,
+        "residual_std": residual_std,
+        "outliers": json_records(outliers),
+        "points": len(pairs.points(x_var, y_var))
+    }
+
 @app.route('/api/scatter/<x_var>/<y_var>')
 def get_scatter_data(x_var, y_var):
-    """API route to get scatter plot data for two variables"""
+    """API route to get scatter plot data for two variables
+    
+    Query parameters:
+    - format: 'rows' (default, a list of objects) or 'columns' (parallel arrays)
+    - dropna: '1' to skip rows where either variable is missing
+    - decimate: '1' to return the precomputed plot points of two numeric variables:
+      every row with both values or, for large data, one per grid cell plus the outliers
+    - summary: '1' to add the regression line of y on x, r², residual spread and outliers
+    """
     try:
-        if x_var not in df.columns or y_var not in df.columns:
+        stats = current_stats()
+        # Columns extracted when the data loaded, so requests don't copy the DataFrame
+        arrays = stats['column_arrays']
+        if x_var not in arrays or y_var not in arrays:
             return jsonify({"error": "Invalid variable names"}), 400
-            
-        # Filter to relevant columns and handle NaN values
-        scatter_df = df[['Country', 'Region', x_var, y_var]].copy()
-        
-        # Calculate correlation (before dropping NaN to get a more accurate count)
-        # Use only rows where both values are present
-        valid_data = scatter_df.dropna(subset=[x_var, y_var])
-        correlation = None
-        if len(valid_data) >= 2:  # Need at least 2 data points for correlation
-            correlation = valid_data[[x_var, y_var]].corr().iloc[0, 1]
-            # Check for NaN correlation (can happen with constant data)
-            if pd.isna(correlation):
-                correlation = None
-        
-        # Convert to dict and handle NaN values
-        scatter_data = []
-        for _, row in scatter_df.iterrows():
-            row_dict = row.to_dict()
-            # Replace NaN with None for JSON serialization
-            for key, value in row_dict.items():
-                if pd.isna(value):
-                    row_dict[key] = None
-            scatter_data.append(row_dict)
+        
+        response_format = request.args.get('format', 'rows')
+        if response_format not in ('rows', 'columns'):
+            return jsonify({"error": "Invalid format, expected 'rows' or 'columns'"}), 400
+        dropna = request.args.get('dropna', '0').lower() in ('1', 'true', 'yes')
+        decimate = request.args.get('decimate', '0').lower() in ('1', 'true', 'yes')
+        summary = request.args.get('summary', '0').lower() in ('1', 'true', 'yes')
+        pairs = stats['pairs']
+        numeric_pair = pairs is not None and (x_var, y_var) in pairs
+        
+        # Correlation over rows where both values are present, from the precomputed
+        # matrix when both variables are numeric (NaN, e.g. for constant data, is sent as null)
+        corr = stats['correlation']
+        if x_var in corr.columns and y_var in corr.columns:
+            correlation = corr.loc[x_var, y_var]
+        else:
+            valid_data = current_frame()[[x_var, y_var]].dropna()
+            correlation = None
+            if len(valid_data) >= 2:  # Need at least 2 data points for correlation
+                correlation = valid_data.corr().iloc[0, 1]
+        
+        if decimate and numeric_pair:
+            rows = pairs.points(x_var, y_var)
+        elif dropna or decimate:
+            rows = np.flatnonzero(~(pd.isna(arrays[x_var]) | pd.isna(arrays[y_var])))
+        else:
+            rows = None
+        
+        # The JSON provider encodes the arrays directly, as row objects or column arrays
+        columns = list(dict.fromkeys(['Country', 'Region', x_var, y_var]))
+        scatter_data = {col: arrays[col] if rows is None else arrays[col][rows] for col in columns}
+        if response_format == 'rows':
+            scatter_data = json_records(scatter_data)
         
         # Create the response data
         data = {
             "data": scatter_data,
             "correlation": correlation
         }
+        if decimate:
+            data["decimated"] = bool(numeric_pair and len(rows) < pairs.fit(x_var, y_var)[0])
+        if summary:
+            data["summary"] = pair_summary(stats, x_var, y_var, correlation) if numeric_pair else None
         return jsonify(data)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+def correlation_matrix(stats, frame, variables, region=None, method='pearson', min_periods=1):
+    """Rounded correlation matrix (a read-only array) for ``variables``, memoized per dataset version
+    
+    Pearson matrices come straight from the precomputed per-region tensor; other
+    methods are computed over the region's rows on first use.
+    """
+    key = (tuple(variables), region, method, min_periods)
+    memo = stats['correlation_memo']
+    matrix = memo.get(key)
+    count_cache('correlation', matrix is not None)
+    if matrix is not None:
+        return matrix
+    
+    group = 0 if region is None else stats['region_index'][region] + 1
+    if method == 'pearson':
+        idx = np.ix_(*[[stats['variables'].index(v) for v in variables]] * 2)
+        corr = stats['correlation_tensor'][group][idx].copy()
+        corr[stats['correlation_counts'][group][idx] < max(min_periods, 1)] = np.nan
+    else:
+        values = frame[variables].to_numpy(dtype=float)
+        if region is not None:
+            values = values[stats['region_codes'] == group - 1]
+        corr, _ = pairwise_correlation(values, method, min_periods)
+    
+    matrix = np.round(corr, 2)
+    matrix.flags.writeable = False
+    # Unlocked: a single dict get or set is atomic, so racing threads at worst
+    # compute the same matrix twice, and the memo can pass its size by a few entries
+    if len(memo) < CORRELATION_MEMO_SIZE:
+        memo[key] = matrix
+    return matrix
+
 @app.route('/api/correlation-matrix')
 def get_correlation_matrix():
-    """API route to get correlation matrix for demographics"""
+    """API route to get a correlation matrix
+    
+    Query parameters:
+    - vars: comma-separated numeric variables (default: key demographics)
+    - region: only use countries in this region
+    - method: 'pearson' (default), 'spearman' or 'kendall'
+    - min_periods: minimum overlapping observations for a pair to get a value (default 1)
+    """
     try:
-        # Use key demographic variables
-        variables = ['Birthrate', 'Deathrate', 'Infant mortality', 'GDP']
+        stats = current_stats()
         
-        # Calculate correlation matrix
-        corr_matrix = df[variables].corr().round(2).values.tolist()
+        # Use key demographic variables unless others are requested
+        variables = request.args.get('vars')
+        if variables:
+            variables = [v.strip() for v in variables.split(',') if v.strip()]
+        else:
+            variables = DEMOGRAPHIC_VARS
+        invalid = [v for v in variables if v not in stats['variables']]
+        if invalid:
+            return jsonify({"error": f"Invalid variables: {', '.join(invalid)}"}), 400
+        
+        method = request.args.get('method', 'pearson')
+        if method not in CORRELATION_METHODS:
+            return jsonify({"error": f"Invalid method, expected one of: {', '.join(CORRELATION_METHODS)}"}), 400
+        
+        try:
+            min_periods = int(request.args.get('min_periods', 1))
+        except ValueError:
+            return jsonify({"error": "min_periods must be an integer"}), 400
+        
+        region = request.args.get('region')
+        if region is not None:
+            region = region.strip()
+            if region not in stats['region_index']:
+                return jsonify({"error": "Invalid region"}), 400
         
-        # Replace NaN values with None for JSON serialization
-        for i in range(len(corr_matrix)):
-            for j in range(len(corr_matrix[i])):
-                if pd.isna(corr_matrix[i][j]):
-                    corr_matrix[i][j] = None
+        try:
+            corr_matrix = correlation_matrix(stats, current_frame(), variables, region, method, min_periods)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
         
         return jsonify({
             "variables": variables,
@@ -485,11 +1286,424 @@ def get_correlation_matrix():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+def group_index(stats, frame, column):
+    """Row positions per value of ``column``, built on first use and kept until the data changes"""
+    index = stats['group_indices'].get(column)
+    count_cache('group_index', index is not None)
+    if index is None:
+        values = frame[column]
+        if not pd.api.types.is_numeric_dtype(values):
+            values = values.astype(str).str.strip().where(values.notna())
+        codes, labels = pd.factorize(values, sort=True)
+        index = GroupIndex(codes, labels.tolist())
+        # Unlocked like the correlation memo; a racing thread builds an identical index
+        stats['group_indices'][column] = index
+    return index
+
+@app.route('/api/aggregate')
+def get_aggregate():
+    """API route to get per-group aggregates
+    
+    Query parameters:
+    - by: column to group by (default: Region)
+    - metrics: comma-separated column:aggregate or column:aggregate:weight, where
+      aggregate is count, sum, mean, std, min, max, median or a percentile such as p90,
+      and sum and mean can be weighted by another column (e.g. GDP:mean:Population)
+    """
+    try:
+        stats = current_stats()
+        frame = current_frame()
+        
+        by = request.args.get('by', 'Region')
+        if by not in frame.columns:
+            return jsonify({"error": "Invalid group-by column"}), 400
+        
+        metrics = request.args.get('metrics')
+        if metrics:
+            metrics = [m.strip() for m in metrics.split(',') if m.strip()]
+        else:
+            metrics = DEFAULT_AGGREGATE_METRICS
+        try:
+            parsed = [parse_metric(m) for m in metrics]
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        invalid = [c for column, _, weight in parsed for c in (column, weight)
+                   if c is not None and c not in stats['variables']]
+        if invalid:
+            return jsonify({"error": f"Invalid variables: {', '.join(invalid)}"}), 400
+        
+        index = group_index(stats, frame, by)
+        results = {}
+        for metric, (column, name, weight) in zip(metrics, parsed):
+            # Sorted columns are precomputed per region; other groupings sort on request
+            sorted_column = stats['sorted_columns'].get(column) if by == 'Region' else None
+            values = frame[column].to_numpy(dtype=float)
+            weights = frame[weight].to_numpy(dtype=float) if weight else None
+            results[metric] = json_values(aggregate(index, name, values, weights, sorted_column))
+        
+        groups = []
+        for i, label in enumerate(index.labels):
+            group = {by: label, "count": int(index.sizes[i])}
+            for metric in metrics:
+                group[metric] = results[metric][i]
+            groups.append(group)
+        
+        return jsonify({
+            "by": by,
+            "metrics": metrics,
+            "groups": groups
+        })
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+# ----- Admin -----
+
+def admin_denied():
+    """Error response if the request may not use the admin routes, or None if it may
+
+    Without ADMIN_TOKEN the admin routes don't exist (404); with it, requests
+    must carry the token as a bearer token (401).
+    """
+    if not ADMIN_TOKEN:
+        return jsonify({"error": "Not found"}), 404
+    if not hmac.compare_digest(request.headers.get('Authorization', ''), f"Bearer {ADMIN_TOKEN}"):
+        return jsonify({"error": "Unauthorized"}), 401
+    return None
+
+@app.route('/admin/dataset')
+def dataset_status():
+    """Admin route reporting the dataset version being served, how long it took to load, its data-quality report and any reload error"""
+    denied = admin_denied()
+    if denied:
+        return denied
+    snapshot = stats_cache.snapshot
+    loaded_at = None
+    if snapshot.loaded_at is not None:
+        loaded_at = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(snapshot.loaded_at))
+    response = jsonify({
+        "file": os.path.basename(DATA_FILE),
+        "version": snapshot.version,
+        "rows": len(snapshot.frame),
+        "columns": len(snapshot.frame.columns),
+        "loaded_at": loaded_at,
+        "load_seconds": round(snapshot.load_seconds, 4),
+        "reloads": stats_cache.reloads,
+        "check_interval": stats_cache.check_interval,
+        "last_error": stats_cache.last_error,
+        "watcher_running": watcher_pid == os.getpid(),
+        "quality": snapshot.quality
+    })
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+dataset_load_seconds = metrics.gauge('dashboard_dataset_load_seconds', 'Seconds taken to load the dataset being served')
+dataset_rows = metrics.gauge('dashboard_dataset_rows', 'Rows in the dataset being served')
+dataset_reloads = metrics.gauge('dashboard_dataset_reloads', 'Times the dataset has been reloaded since the process started')
+dataset_info = metrics.gauge('dashboard_dataset_info', 'Version of the dataset being served', ['version'])
+startup_seconds = metrics.gauge('dashboard_startup_seconds', 'Seconds spent in each startup phase', ['phase'])
+
+def collect_dataset_metrics():
+    snapshot = stats_cache.snapshot
+    dataset_load_seconds.set(snapshot.load_seconds)
+    dataset_rows.set(len(snapshot.frame))
+    dataset_reloads.set(stats_cache.reloads)
+    dataset_info.clear()
+    dataset_info.set(1, version=snapshot.version or '')
+    for name, seconds in startup_timings.items():
+        startup_seconds.set(seconds, phase=name)
+
+metrics.collectors.append(collect_dataset_metrics)
+
+@app.route('/metrics')
+def get_metrics():
+    """Request, cache and dataset metrics for this worker process in the Prometheus text format"""
+    denied = admin_denied()
+    if denied:
+        return denied
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+# ----- Server-side plot rendering -----
+
+class RenderCache:
+    """Rendered PNGs in an in-memory LRU, backed by files on disk
+    
+    Keys start with the dataset version, so a data reload never serves an old
+    plot; files for other versions are removed the first time a new version
+    is stored. Concurrent requests for the same plot share one render.
+    """
+    
+    def __init__(self, directory, max_entries):
+        self.directory = directory
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self._version = None
+        self._lock = threading.Lock()
+    
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.png")
+    
+    def get(self, key):
+        """Cached PNG bytes for ``key``, or None"""
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+        count_cache('render_memory', data is not None)
+        if data is not None:
+            return data
+        try:
+            with open(self._path(key), 'rb') as f:
+                data = f.read()
+        except OSError:
+            count_cache('render_disk', False)
+            return None
+        count_cache('render_disk', True)
+        self._remember(key, data)
+        return data
+    
+    def _remember(self, key, data):
+        with self._lock:
+            self._entries[key] = data
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def put(self, key, data):
+        self._remember(key, data)
+        version = key.split('-', 1)[0]
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            if version != self._version:
+                self._version = version
+                for name in os.listdir(self.directory):
+                    if not name.startswith(version):
+                        os.remove(os.path.join(self.directory, name))
+            tmp_path = f"{self._path(key)}.{os.getpid()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, self._path(key))
+        except OSError as e:
+            # The disk cache is optional (e.g. on a read-only filesystem)
+            print(f"Could not write render cache: {str(e)}")
+    
+    def get_or_render(self, key, kind, kwargs):
+        """PNG bytes for ``key``, rendering ``kind`` with ``kwargs`` if it isn't cached"""
+        data = self.get(key)
+        if data is not None:
+            return data
+        
+        with self._lock:
+            inflight = self._inflight.get(key)
+            if inflight is None:
+                inflight = submit_render(kind, kwargs)
+                self._inflight[key] = inflight
+        pool, future = inflight
+        try:
+            try:
+                data = future.result(timeout=RENDER_TIMEOUT)
+            except BrokenProcessPool:
+                # A render worker died (e.g. killed for using too much memory); retry once in a new pool
+                restart_render_pool(pool)
+                data = submit_render(kind, kwargs)[1].result(timeout=RENDER_TIMEOUT)
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+        self.put(key, data)
+        return data
+
+render_cache = RenderCache(RENDER_CACHE_DIR, RENDER_CACHE_SIZE)
+render_pool = None
+render_pool_pid = None
+render_pool_lock = threading.Lock()
+
+def render_worker_pool():
+    """This process's render pool, started on first use and again after a restart"""
+    global render_pool, render_pool_pid
+    with render_pool_lock:
+        if render_pool is None or render_pool_pid != os.getpid():
+            # Spawned workers import plots.py rather than inheriting the app and its data. Under
+            # `python app.py`, spawn also re-runs the __main__ module, so each worker loads app.py
+            # (and its data) as well; under gunicorn the app is not __main__.
+            render_pool = ProcessPoolExecutor(max_workers=RENDER_WORKERS,
+                                              mp_context=multiprocessing.get_context('spawn'))
+            render_pool_pid = os.getpid()
+        return render_pool
+
+def restart_render_pool(pool):
+    """Replace ``pool`` after one of its workers died, which leaves it unusable"""
+    global render_pool
+    with render_pool_lock:
+        # Renders that failed together restart the pool only once
+        if render_pool is pool:
+            render_pool = None
+    pool.shutdown(wait=False)
+
+def submit_render(kind, kwargs):
+    """Render a plot in the worker pool; returns the pool and a Future with the PNG bytes"""
+    import plots
+    pool = render_worker_pool()
+    try:
+        return pool, pool.submit(plots.render, kind, kwargs)
+    except BrokenProcessPool:
+        restart_render_pool(pool)
+        pool = render_worker_pool()
+        return pool, pool.submit(plots.render, kind, kwargs)
+
+@app.route('/render/<kind>')
+@app.route('/render/<kind>/<x_var>')
+@app.route('/render/<kind>/<x_var>/<y_var>')
+def render_plot(kind, x_var=None, y_var=None):
+    """Render a plot of the current data as a PNG
+    
+    - /render/histogram/<variable>?bins=10
+    - /render/scatter/<x_var>/<y_var> (points colored by region)
+    - /render/correlation?vars=Birthrate,Deathrate,... (heatmap)
+    
+    Each accepts ?region= to plot a single region.
+    """
+    try:
+        stats = current_stats()
+        frame = current_frame()
+        numeric = stats['variables']
+        
+        region = request.args.get('region')
+        if region is not None:
+            region = region.strip()
+            if region not in stats['region_index']:
+                return jsonify({"error": "Invalid region"}), 400
+            # The same rows as the API routes, from the index built at load
+            frame = frame.iloc[stats['group_indices']['Region'].rows(stats['region_index'][region])]
+        suffix = f" ({region})" if region else ""
+        
+        params = {'region': region or None}
+        if kind == 'histogram':
+            if x_var not in numeric or y_var is not None:
+                return jsonify({"error": "Expected /render/histogram/<numeric variable>"}), 400
+            try:
+                bins = int(request.args.get('bins', HISTOGRAM_BINS))
+            except ValueError:
+                return jsonify({"error": "bins must be an integer"}), 400
+            if not 1 <= bins <= HISTOGRAM_MAX_BINS:
+                return jsonify({"error": f"bins must be between 1 and {HISTOGRAM_MAX_BINS}"}), 400
+            values = frame[x_var].dropna().to_numpy(dtype=float)
+            if len(values) == 0:
+                return jsonify({"error": "Not enough data to plot"}), 400
+            params.update(variable=x_var, bins=bins)
+            kwargs = {'values': values, 'variable': x_var, 'bins': bins,
+                      'title': f"Distribution of {x_var}{suffix}"}
+        elif kind == 'scatter':
+            if x_var not in numeric or y_var not in numeric:
+                return jsonify({"error": "Expected /render/scatter/<numeric x>/<numeric y>"}), 400
+            valid = frame[[x_var, y_var, 'Region']].dropna(subset=[x_var, y_var])
+            if len(valid) == 0:
+                return jsonify({"error": "Not enough data to plot"}), 400
+            params.update(x=x_var, y=y_var)
+            kwargs = {'x': valid[x_var].to_numpy(dtype=float), 'y': valid[y_var].to_numpy(dtype=float),
+                      'regions': valid['Region'].astype(str).str.strip().tolist(),
+                      'x_var': x_var, 'y_var': y_var,
+                      'title': f"{x_var} vs {y_var}{suffix}"}
+        elif kind == 'correlation':
+            if x_var is not None:
+                return jsonify({"error": "Expected /render/correlation?vars=..."}), 400
+            variables = request.args.get('vars')
+            variables = [v.strip() for v in variables.split(',') if v.strip()] if variables else DEMOGRAPHIC_VARS
+            invalid = [v for v in variables if v not in numeric]
+            if invalid or len(variables) < 2:
+                return jsonify({"error": f"Expected at least two numeric variables, got invalid: {', '.join(invalid)}"}), 400
+            matrix = correlation_matrix(stats, current_frame(), variables, region or None)
+            params.update(vars=variables)
+            kwargs = {'matrix': np.array(matrix, dtype=float), 'variables': variables,
+                      'title': f"Correlation Matrix{suffix}"}
+        else:
+            return jsonify({"error": "Invalid plot kind, expected histogram, scatter or correlation"}), 400
+        
+        digest = hashlib.sha1(json.dumps([kind, params], sort_keys=True).encode('utf-8')).hexdigest()[:16]
+        key = f"{current_snapshot().version}-{kind}-{digest}"
+        if request.if_none_match.contains_weak(key):
+            count_cache('http', True)
+            response = app.response_class(status=304)
+        else:
+            count_cache('http', False)
+            with phase('plot'):
+                png = render_cache.get_or_render(key, kind, kwargs)
+            response = Response(png, mimetype='image/png')
+        response.set_etag(key)
+        response.headers['Cache-Control'] = f"public, max-age={API_CACHE_MAX_AGE}"
+        return response
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+# ----- Startup timing report -----
+
+def parse_importtime(output):
+    """Parse `python -X importtime` output into (module, depth, self_us, cumulative_us) tuples"""
+    modules = []
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip(' ')) - 1) // 2
+        modules.append((name.strip(), depth, int(self_us), int(cumulative_us)))
+    return modules
+
+def startup_report(top=15):
+    """Start the app in a fresh interpreter under `-X importtime` and summarize where boot time goes"""
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c',
+         'import json, app; print(json.dumps(app.startup_timings))'],
+        cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True)
+    wall = time.perf_counter() - started
+    if result.returncode != 0:
+        raise RuntimeError(f"Starting the app failed:\n{result.stderr[-2000:]}")
+    
+    modules = parse_importtime(result.stderr)
+    phases = json.loads(result.stdout.strip().splitlines()[-1])
+    app_import = next((m for m in modules if m[0] == 'app' and m[1] == 0), None)
+    # Direct imports made while importing app, i.e. one level below it
+    direct = [m for m in modules if m[1] == 1]
+    return {
+        'python': sys.version.split()[0],
+        'wall_seconds': round(wall, 4),
+        'app_import_seconds': round(app_import[3] / 1e6, 4) if app_import else None,
+        'phases_seconds': {name: round(seconds, 4) for name, seconds in phases.items()},
+        'top_cumulative': [{'module': name, 'seconds': round(cum / 1e6, 4)}
+                           for name, _, _, cum in sorted(direct, key=lambda m: -m[3])[:top]],
+        'top_self': [{'module': name, 'seconds': round(self_us / 1e6, 4)}
+                     for name, _, self_us, _ in sorted(modules, key=lambda m: -m[2])[:top]],
+    }
+
+def format_startup_report(report):
+    lines = [f"Python {report['python']}: interpreter + app startup {report['wall_seconds']:.3f}s, "
+             f"import app {report['app_import_seconds']:.3f}s",
+             "", "Startup phases:"]
+    lines += [f"  {name:<12} {seconds:8.3f}s" for name, seconds in report['phases_seconds'].items()]
+    lines += ["", "Slowest imports made by app (cumulative):"]
+    lines += [f"  {m['module']:<40} {m['seconds']:8.3f}s" for m in report['top_cumulative']]
+    lines += ["", "Slowest individual modules (self):"]
+    lines += [f"  {m['module']:<40} {m['seconds']:8.3f}s" for m in report['top_self']]
+    return '\n'.join(lines)
+
 # Create necessary directories for the Flask app
 if not os.path.exists('static'):
     os.makedirs('static')
 if not os.path.exists('templates'):
     os.makedirs('templates')
 
+startup_timings['total'] = time.perf_counter() - STARTUP_STARTED
+
 if __name__ == '__main__':
-    app.run(debug=True, port=5000)
\ No newline at end of file
+    parser = argparse.ArgumentParser(description='Country Analysis Dashboard')
+    parser.add_argument('--port', type=int, default=5000)
+    parser.add_argument('--startup-report', action='store_true',
+                        help='print a breakdown of startup time (imports and loading phases) and exit')
+    parser.add_argument('--json', action='store_true',
+                        help='print the startup report as JSON, e.g. to compare between commits')
+    args = parser.parse_args()
+    
+    if args.startup_report:
+        report = startup_report()
+        print(json.dumps(report, indent=2) if args.json else format_startup_report(report))
+    else:
+        app.run(debug=True, port=args.port)
\ No newline at end of file
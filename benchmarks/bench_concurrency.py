@@ -0,0 +1,256 @@
+"""Benchmark concurrent clients against gunicorn with sync and threaded workers.
+
+Starts the app under gunicorn (with gunicorn.conf.py) once per worker setup,
+then runs a number of clients in parallel for a fixed time, each requesting a
+mix of pages and API routes back to back. Optional slow clients download the
+largest gallery image at a limited rate alongside them, like visitors on a
+slow connection. Reports throughput, latency percentiles and errors of the
+fast clients, and the memory of the worker processes (resident, and
+proportional, which splits pages shared between processes).
+
+    python benchmarks/bench_concurrency.py --setups sync,gthread --clients 1,8,32 --slow 0,8
+
+Usage:
+    python benchmarks/bench_concurrency.py [--setups sync,gthread] [--workers 2] [--threads 8]
+                                           [--clients 1,8,32] [--slow 0,4] [--slow-rate 65536]
+                                           [--duration 10] [--output results.json]
+"""
+import argparse
+import glob
+import http.client
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Requests each fast client cycles through
+ROUTES = [
+    '/',
+    '/api/countries',
+    '/api/countries?region=OCEANIA&fields=Country,GDP,Literacy',
+    '/api/histogram/GDP',
+    '/api/scatter/GDP/Literacy?format=columns&dropna=1',
+    '/api/correlation-matrix',
+    '/api/aggregate',
+    '/api/search?q=ger',
+]
+
+# Worker setups, as environment variables for gunicorn.conf.py
+SETUPS = {
+    'sync': {'GUNICORN_WORKER_CLASS': 'sync', 'GUNICORN_PRELOAD': '0'},
+    'sync-preload': {'GUNICORN_WORKER_CLASS': 'sync', 'GUNICORN_PRELOAD': '1'},
+    'gthread': {'GUNICORN_WORKER_CLASS': 'gthread', 'GUNICORN_PRELOAD': '1'},
+}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(setup, workers, threads, port):
+    """Start gunicorn with one of SETUPS and wait until it answers"""
+    env = dict(os.environ, WEB_CONCURRENCY=str(workers), **SETUPS[setup])
+    if SETUPS[setup]['GUNICORN_WORKER_CLASS'] == 'gthread':
+        env['GUNICORN_THREADS'] = str(threads)
+    else:
+        env.pop('GUNICORN_THREADS', None)
+    server = subprocess.Popen([sys.executable, '-m', 'gunicorn', '--config', 'gunicorn.conf.py',
+                               '--bind', f'127.0.0.1:{port}', 'app:app'],
+                              cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 120
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"gunicorn exited with status {server.returncode}")
+        try:
+            # Every worker loads its own data without preload, so wait for all of them
+            for _ in range(workers * 2):
+                get(port, '/')
+            return server
+        except OSError:
+            time.sleep(0.2)
+    server.kill()
+    raise RuntimeError('gunicorn did not start')
+
+
+def stop_server(server):
+    server.terminate()
+    try:
+        server.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        server.kill()
+
+
+def get(port, path, timeout=60):
+    """Status and body size of one GET on a new connection"""
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=timeout)
+    try:
+        connection.request('GET', path, headers={'Connection': 'close'})
+        response = connection.getresponse()
+        return response.status, len(response.read())
+    finally:
+        connection.close()
+
+
+def worker_memory(server):
+    """Summed resident and proportional set size (MB) of the worker processes, where /proc allows"""
+    try:
+        with open(f'/proc/{server.pid}/task/{server.pid}/children') as f:
+            pids = f.read().split()
+    except OSError:
+        return None, None
+    rss = pss = 0
+    for pid in pids:
+        try:
+            with open(f'/proc/{pid}/smaps_rollup') as f:
+                for line in f:
+                    if line.startswith('Rss:'):
+                        rss += int(line.split()[1])
+                    elif line.startswith('Pss:'):
+                        pss += int(line.split()[1])
+        except OSError:
+            return None, None
+    return round(rss / 1024, 1), round(pss / 1024, 1)
+
+
+def fast_client(port, offset, deadline, latencies, errors):
+    i = offset
+    while time.monotonic() < deadline:
+        path = ROUTES[i % len(ROUTES)]
+        i += 1
+        start = time.perf_counter()
+        try:
+            status, _ = get(port, path)
+        except OSError:
+            errors.append(path)
+            continue
+        if status != 200:
+            errors.append(path)
+        else:
+            latencies.append(time.perf_counter() - start)
+
+
+def slow_client(port, path, rate, deadline, downloads):
+    """Download ``path`` at about ``rate`` bytes per second, over and over, until ``deadline``"""
+    while time.monotonic() < deadline:
+        with socket.socket() as sock:
+            # A small receive window, so the server can't hand the whole response to the kernel at once
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 16384)
+            sock.settimeout(60)
+            try:
+                sock.connect(('127.0.0.1', port))
+                sock.sendall(f"GET {path} HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n".encode())
+                while time.monotonic() < deadline:
+                    data = sock.recv(4096)
+                    if not data:
+                        downloads.append(path)
+                        break
+                    time.sleep(len(data) / rate)
+            except OSError:
+                continue
+
+
+def run_load(port, clients, slow, slow_path, slow_rate, duration):
+    latencies, errors, downloads = [], [], []
+    deadline = time.monotonic() + duration
+    threads = [threading.Thread(target=slow_client, args=(port, slow_path, slow_rate, deadline, downloads))
+               for _ in range(slow)]
+    threads += [threading.Thread(target=fast_client, args=(port, i, deadline, latencies, errors))
+                for i in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    timings = np.array(latencies) * 1000 if latencies else np.zeros(1)
+    return {
+        'requests': len(latencies),
+        'errors': len(errors),
+        'rps': round(len(latencies) / duration, 1),
+        'p50_ms': round(float(np.percentile(timings, 50)), 2),
+        'p95_ms': round(float(np.percentile(timings, 95)), 2),
+        'p99_ms': round(float(np.percentile(timings, 99)), 2),
+        'slow_downloads': len(downloads),
+    }
+
+
+def largest_image():
+    images = glob.glob(os.path.join(ROOT, 'static', 'visualizations', '*.png'))
+    path = max(images, key=os.path.getsize)
+    return '/static/visualizations/' + os.path.basename(path), os.path.getsize(path)
+
+
+def run(setups, workers, threads, client_counts, slow_counts, slow_rate, duration):
+    slow_path, slow_size = largest_image()
+    print(f"{workers} workers, {threads} threads per gthread worker; slow clients download {slow_path} "
+          f"({slow_size / 1024:.0f} KB) at {slow_rate / 1024:.0f} KB/s; {duration:.0f} s per run")
+    results = {}
+    for setup in setups:
+        port = free_port()
+        server = start_server(setup, workers, threads, port)
+        try:
+            rss, pss = worker_memory(server)
+            memory = '' if rss is None else f" (workers: {rss:.0f} MB resident, {pss:.0f} MB proportional)"
+            print(f"\n{setup}{memory}")
+            print(f"  {'clients':>7} {'slow':>5} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}")
+            runs = []
+            for slow in slow_counts:
+                for clients in client_counts:
+                    result = run_load(port, clients, slow, slow_path, slow_rate, duration)
+                    runs.append(dict(result, clients=clients, slow=slow))
+                    print(f"  {clients:>7} {slow:>5} {result['rps']:8.1f} {result['p50_ms']:9.2f} "
+                          f"{result['p95_ms']:9.2f} {result['p99_ms']:9.2f} {result['errors']:>7}")
+            results[setup] = {'worker_rss_mb': rss, 'worker_pss_mb': pss, 'runs': runs}
+        finally:
+            stop_server(server)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--setups', default='sync,gthread', help=f"comma-separated, from {', '.join(SETUPS)}")
+    parser.add_argument('--workers', type=int, default=2, help='gunicorn worker processes')
+    parser.add_argument('--threads', type=int, default=8, help='threads per gthread worker')
+    parser.add_argument('--clients', default='1,8,32', help='comma-separated numbers of concurrent clients')
+    parser.add_argument('--slow', default='0,4', help='comma-separated numbers of slow clients running alongside')
+    parser.add_argument('--slow-rate', type=int, default=65536, help='bytes per second each slow client reads')
+    parser.add_argument('--duration', type=float, default=10, help='seconds per run')
+    parser.add_argument('--output', help='write the results to this JSON file')
+    args = parser.parse_args()
+
+    setups = [setup.strip() for setup in args.setups.split(',') if setup.strip()]
+    unknown = [setup for setup in setups if setup not in SETUPS]
+    if unknown:
+        parser.error(f"unknown setups: {', '.join(unknown)}")
+    results = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            'python': platform.python_version(),
+            'cpus': os.cpu_count(),
+            'workers': args.workers,
+            'threads': args.threads,
+            'duration': args.duration,
+            'slow_rate': args.slow_rate,
+        },
+        'setups': run(setups, args.workers, args.threads,
+                      [int(n) for n in args.clients.split(',')], [int(n) for n in args.slow.split(',')],
+                      args.slow_rate, args.duration),
+    }
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nWrote {args.output}")
+
+
+if __name__ == '__main__':
+    main()
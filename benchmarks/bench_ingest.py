@@ -0,0 +1,87 @@
+"""Benchmark loading the dataset CSV: whole-file parse versus the chunked schema ingest.
+
+Writes a synthetic CSV by sampling rows of the shipped data, then loads it in a
+fresh process per loader so each one's peak memory (max RSS) is measured alone.
+
+Usage:
+    python benchmarks/bench_ingest.py [--rows 1000000] [--chunk-rows 100000]
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+import datastore
+
+
+def legacy_load(path):
+    """The original loader: parse the whole file, then coerce the numeric columns one by one"""
+    frame = pd.read_csv(path)
+    frame = frame.replace([np.inf, -np.inf], np.nan)
+    for col in datastore.NUMERIC_COLUMNS:
+        if col in frame.columns:
+            frame[col] = pd.to_numeric(frame[col], errors='coerce')
+    return frame
+
+
+def write_synthetic_csv(path, rows, seed=0):
+    """CSV with ``rows`` rows sampled from the shipped data"""
+    shipped = pd.read_csv(datastore.DATA_FILE)
+    rng = np.random.default_rng(seed)
+    sample = shipped.iloc[rng.integers(0, len(shipped), size=rows)].reset_index(drop=True)
+    sample['Country'] = sample['Country'] + '_' + pd.Series(np.arange(rows)).astype(str)
+    sample.to_csv(path, index=False)
+
+
+def measure(loader, path, chunk_rows):
+    """Load ``path`` in this process and print the timing and peak memory as JSON"""
+    start = time.perf_counter()
+    if loader == 'legacy':
+        frame = legacy_load(path)
+    else:
+        frame, _ = datastore.load_dataset(path, chunk_rows)
+    seconds = time.perf_counter() - start
+    # ru_maxrss is in kilobytes on Linux
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    frame_mb = frame.memory_usage(deep=True).sum() / 2**20
+    print(json.dumps({'seconds': seconds, 'peak_mb': peak_mb, 'frame_mb': frame_mb}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000, help='synthetic dataset size')
+    parser.add_argument('--chunk-rows', type=int, default=datastore.INGEST_CHUNK_ROWS,
+                        help='rows per chunk for the chunked ingest')
+    parser.add_argument('--measure', choices=['legacy', 'chunked'], help=argparse.SUPPRESS)
+    parser.add_argument('--path', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    
+    if args.measure:
+        measure(args.measure, args.path, args.chunk_rows)
+        return
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'countries.csv')
+        write_synthetic_csv(path, args.rows)
+        size_mb = os.path.getsize(path) / 2**20
+        print(f"\n{args.rows:,} rows ({size_mb:.0f} MB CSV, chunks of {args.chunk_rows:,} rows)")
+        print(f"  {'loader':<10} {'seconds':>8} {'peak MB':>9} {'frame MB':>9}")
+        for loader in ('legacy', 'chunked'):
+            output = subprocess.run([sys.executable, __file__, '--measure', loader, '--path', path,
+                                     '--chunk-rows', str(args.chunk_rows)],
+                                    check=True, capture_output=True, text=True).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            print(f"  {loader:<10} {result['seconds']:8.2f} {result['peak_mb']:9.0f} {result['frame_mb']:9.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,226 @@
+"""Benchmark every page and API route through Flask's test client.
+
+Runs each route against the shipped dataset and against synthetic datasets
+scaled up from it, and reports latency (first request, mean, p50, p95),
+throughput, response size and peak Python memory per request. Results can be
+saved as JSON and compared with an earlier run to catch regressions:
+
+    python benchmarks/bench_routes.py --output before.json
+    ... change something ...
+    python benchmarks/bench_routes.py --output after.json --compare before.json
+
+Usage:
+    python benchmarks/bench_routes.py [--sizes shipped,10000,100000,1000000] [--repeat 20]
+                                      [--routes api/] [--output results.json]
+                                      [--compare baseline.json] [--threshold 0.2]
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+import app as dashboard
+from datastore import SCHEMA
+
+# (name, url) for each route; names are the keys in the JSON results
+ROUTES = [
+    ('page /', '/'),
+    ('page /histograms', '/histograms'),
+    ('page /scatter', '/scatter'),
+    ('page /visualizations', '/visualizations'),
+    ('api countries', '/api/countries'),
+    ('api countries ndjson', '/api/countries?format=ndjson'),
+    ('api countries region', '/api/countries?region=OCEANIA&fields=Country,GDP,Literacy'),
+    ('api country', '/api/countries/FRA'),
+    ('api country similar', '/api/countries/FRA/similar?k=10'),
+    ('api search prefix', '/api/search?q=ger'),
+    ('api search fuzzy', '/api/search?q=grmany'),
+    ('api histogram', '/api/histogram/GDP'),
+    ('api histogram fd log', '/api/histogram/GDP?strategy=fd&log=1'),
+    ('api histogram region', '/api/histogram/Literacy?region=OCEANIA&bins=20'),
+    ('api histogram categorical', '/api/histogram/Region'),
+    ('api scatter', '/api/scatter/GDP/Literacy'),
+    ('api scatter columns', '/api/scatter/GDP/Literacy?format=columns&dropna=1'),
+    ('api scatter decimated', '/api/scatter/GDP/Literacy?format=columns&decimate=1&summary=1'),
+    ('api correlation', '/api/correlation-matrix'),
+    ('api correlation spearman', '/api/correlation-matrix?vars=GDP,Literacy,Phones,Birthrate,Deathrate&method=spearman'),
+    ('api aggregate', '/api/aggregate'),
+    ('api aggregate percentiles', '/api/aggregate?metrics=GDP:median,GDP:p90,Literacy:std,Population:sum'),
+]
+
+
+def synthetic_dataset(frame, rows, seed=0):
+    """``rows`` rows sampled from ``frame``, with numeric values jittered by up to 5% within their schema ranges"""
+    rng = np.random.default_rng(seed)
+    sample = frame.iloc[rng.integers(0, len(frame), size=rows)].reset_index(drop=True)
+    sample['Country'] = sample['Country'].astype(str) + '_' + pd.Series(np.arange(rows)).astype(str)
+    for field in SCHEMA:
+        if field.kind == 'text' or field.name not in sample.columns:
+            continue
+        values = sample[field.name].to_numpy(dtype=float) * rng.uniform(0.95, 1.05, size=rows)
+        values = np.clip(values, field.low if field.low is not None else -np.inf,
+                         field.high if field.high is not None else np.inf)
+        if field.kind == 'int' and not np.isnan(values).any():
+            values = np.round(values).astype(np.int64)
+        sample[field.name] = values
+    return sample
+
+
+def use_dataset(frame):
+    """Point the app at ``frame``; returns the seconds taken to build its statistics"""
+    start = time.perf_counter()
+    stats = dashboard.build_stats(frame)
+    seconds = time.perf_counter() - start
+    dashboard.stats_cache.snapshot = dashboard.Snapshot(frame, stats, f'bench-{len(frame)}', None, seconds, None)
+    dashboard.stats_cache.check_interval = float('inf')
+    return seconds
+
+
+def request(client, url):
+    """One request, reading the whole (possibly streamed) body; returns (status, bytes)"""
+    response = client.get(url)
+    size = len(response.get_data())
+    response.close()
+    return response.status_code, size
+
+
+def measure(client, url, repeat):
+    """Latency, throughput and peak memory of ``repeat`` requests to ``url``"""
+    start = time.perf_counter()
+    status, size = request(client, url)
+    first_ms = (time.perf_counter() - start) * 1000
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        request(client, url)
+        timings.append((time.perf_counter() - start) * 1000)
+
+    # Measured separately: tracing allocations slows the request down
+    tracemalloc.start()
+    request(client, url)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    timings = np.array(timings)
+    return {
+        'status': status,
+        'bytes': size,
+        'first_ms': round(first_ms, 3),
+        'mean_ms': round(float(timings.mean()), 3),
+        'p50_ms': round(float(np.percentile(timings, 50)), 3),
+        'p95_ms': round(float(np.percentile(timings, 95)), 3),
+        'rps': round(1000 * len(timings) / float(timings.sum()), 1),
+        'peak_kb': round(peak / 1024, 1),
+    }
+
+
+def repeat_for(rows, repeat):
+    """Fewer repeats for bigger datasets, so a full run stays in minutes"""
+    return max(2, int(repeat * min(1.0, 10_000 / max(rows, 1))))
+
+
+def run(sizes, repeat, route_filter=None):
+    shipped = dashboard.stats_cache.snapshot.frame
+    client = dashboard.app.test_client()
+    routes = [(name, url) for name, url in ROUTES if not route_filter or route_filter in name or route_filter in url]
+    results = {}
+    for size in sizes:
+        frame = shipped if size == 'shipped' else synthetic_dataset(shipped, int(size))
+        stats_seconds = use_dataset(frame)
+        runs = repeat_for(len(frame), repeat)
+        print(f"\n{len(frame):,} rows (statistics built in {stats_seconds:.2f} s, {runs} requests per route)")
+        print(f"  {'route':<28} {'status':>6} {'first ms':>9} {'p50 ms':>9} {'p95 ms':>9} {'req/s':>8} {'KB':>9} {'peak KB':>9}")
+        routes_result = {}
+        for name, url in routes:
+            result = measure(client, url, runs)
+            routes_result[name] = dict(result, url=url)
+            print(f"  {name:<28} {result['status']:>6} {result['first_ms']:9.2f} {result['p50_ms']:9.2f} "
+                  f"{result['p95_ms']:9.2f} {result['rps']:8.1f} {result['bytes'] / 1024:9.1f} {result['peak_kb']:9.1f}")
+        results[str(size)] = {'rows': len(frame), 'stats_seconds': round(stats_seconds, 4),
+                              'requests': runs, 'routes': routes_result}
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline, threshold):
+    """Print routes whose p50 latency grew by more than ``threshold``; returns how many did"""
+    regressions = 0
+    print(f"\nCompared with {baseline['meta'].get('commit') or 'baseline'} (p50, regressions over {threshold:.0%}):")
+    for size, dataset in results['datasets'].items():
+        old_dataset = baseline['datasets'].get(size)
+        if old_dataset is None:
+            continue
+        for name, result in dataset['routes'].items():
+            old = old_dataset['routes'].get(name)
+            if old is None or old['p50_ms'] <= 0:
+                continue
+            change = result['p50_ms'] / old['p50_ms'] - 1
+            if change > threshold:
+                regressions += 1
+                marker = 'REGRESSION'
+            elif change < -threshold:
+                marker = 'faster'
+            else:
+                continue
+            print(f"  {size:>8} {name:<28} {old['p50_ms']:9.2f} -> {result['p50_ms']:9.2f} ms ({change:+.0%}) {marker}")
+    if not regressions:
+        print("  no regressions")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default='shipped,10000,100000,1000000',
+                        help="comma-separated dataset sizes in rows ('shipped' is the real data)")
+    parser.add_argument('--repeat', type=int, default=20, help='requests per route at 10,000 rows or fewer')
+    parser.add_argument('--routes', help='only routes whose name or URL contains this text')
+    parser.add_argument('--output', help='write the results to this JSON file')
+    parser.add_argument('--compare', help='JSON results of an earlier run to compare with')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='relative p50 slowdown reported as a regression (default 0.2)')
+    args = parser.parse_args()
+
+    sizes = [size.strip() for size in args.sizes.split(',') if size.strip()]
+    results = {
+        'meta': {
+            'commit': git_commit(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'numpy': np.__version__,
+            'repeat': args.repeat,
+        },
+        'datasets': run(sizes, args.repeat, args.routes),
+    }
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nWrote {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
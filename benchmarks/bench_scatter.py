@@ -0,0 +1,99 @@
+"""Benchmark /api/scatter/<x_var>/<y_var> at the shipped and a synthetic dataset size.
+
+Compares the previous iterrows() serializer with the vectorized row and
+column encoders, with and without ?dropna=1.
+
+Usage:
+    python benchmarks/bench_scatter.py [--rows 1000000] [--repeat 5] [--skip-legacy]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from flask import jsonify
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import app as dashboard
+
+
+def legacy_scatter(frame, x_var, y_var):
+    """The original iterrows() implementation, kept for comparison"""
+    scatter_df = frame[['Country', 'Region', x_var, y_var]].copy()
+    valid_data = scatter_df.dropna(subset=[x_var, y_var])
+    correlation = None
+    if len(valid_data) >= 2:
+        correlation = valid_data[[x_var, y_var]].corr().iloc[0, 1]
+        if pd.isna(correlation):
+            correlation = None
+    scatter_data = []
+    for _, row in scatter_df.iterrows():
+        row_dict = row.to_dict()
+        for key, value in row_dict.items():
+            if pd.isna(value):
+                row_dict[key] = None
+        scatter_data.append(row_dict)
+    return jsonify({"data": scatter_data, "correlation": correlation})
+
+
+def scale_dataset(frame, rows, seed=0):
+    """Synthetic dataset with ``rows`` rows sampled from the shipped data"""
+    rng = np.random.default_rng(seed)
+    sample = frame.iloc[rng.integers(0, len(frame), size=rows)].reset_index(drop=True)
+    sample['Country'] = sample['Country'].astype(str) + '_' + pd.Series(np.arange(rows)).astype(str)
+    return sample
+
+
+def use_dataset(frame):
+    """Point the app at ``frame`` and rebuild its statistics"""
+    dashboard.stats_cache.snapshot = dashboard.Snapshot(frame, dashboard.build_stats(frame), 'bench', None, 0.0, None)
+    dashboard.stats_cache.check_interval = float('inf')
+
+
+def best_of(fn, repeat):
+    """Best wall-clock time of ``repeat`` calls, in milliseconds"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return min(timings)
+
+
+def run(frame, repeat, skip_legacy, x_var='GDP', y_var='Literacy'):
+    use_dataset(frame)
+    client = dashboard.app.test_client()
+    url = f'/api/scatter/{x_var}/{y_var}'
+    
+    results = []
+    if not skip_legacy:
+        def legacy():
+            with dashboard.app.test_request_context(url):
+                legacy_scatter(frame, x_var, y_var).get_data()
+        results.append(('legacy iterrows', best_of(legacy, repeat)))
+    for label, query in [('rows', ''), ('rows dropna', '?dropna=1'),
+                         ('columns', '?format=columns'), ('columns dropna', '?format=columns&dropna=1')]:
+        results.append((label, best_of(lambda: client.get(url + query).get_data(), repeat)))
+    
+    print(f"\n{len(frame):,} rows ({x_var} vs {y_var}, best of {repeat})")
+    for label, ms in results:
+        print(f"  {label:<16} {ms:10.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000, help='synthetic dataset size')
+    parser.add_argument('--repeat', type=int, default=5, help='runs per measurement')
+    parser.add_argument('--skip-legacy', action='store_true',
+                        help='skip the iterrows() baseline on the synthetic dataset (it is very slow)')
+    args = parser.parse_args()
+    
+    shipped = dashboard.stats_cache.snapshot.frame
+    run(shipped, args.repeat, skip_legacy=False)
+    run(scale_dataset(shipped, args.rows), max(1, args.repeat // 5), skip_legacy=args.skip_legacy)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+"""Write precompressed and modern-format variants of the static assets.
+
+For text assets (JavaScript, CSS, ...) this writes ``.gz`` and, when the
+``brotli`` package is installed, ``.br`` siblings. For PNG images it writes
+``.webp`` and, when Pillow supports it, ``.avif`` siblings. The app serves
+these instead of the originals to clients that accept them. Variants that are
+newer than their source are left alone, so re-running the build is cheap.
+
+Usage:
+    python build_static.py [static_dir]
+"""
+import gzip
+import os
+import sys
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    from PIL import Image, features
+except ImportError:
+    Image = None
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+
+# Text assets worth compressing, and the smallest file worth compressing
+COMPRESSIBLE_EXTENSIONS = ('.js', '.css', '.html', '.json', '.svg', '.txt', '.map')
+MIN_SIZE = 256
+
+def is_fresh(source, target):
+    """True if ``target`` exists and is at least as new as ``source``"""
+    return os.path.exists(target) and os.path.getmtime(target) >= os.path.getmtime(source)
+
+def image_formats():
+    """Image variants ('webp', 'avif') this Pillow build can write"""
+    if Image is None:
+        return []
+    return [fmt for fmt in ('webp', 'avif') if features.check(fmt)]
+
+def compress_file(path):
+    """Write .gz (and .br) siblings for a text asset; returns the files written"""
+    written = []
+    with open(path, 'rb') as f:
+        data = f.read()
+    if len(data) < MIN_SIZE:
+        return written
+
+    encoders = [('.gz', lambda body: gzip.compress(body, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        encoders.append(('.br', lambda body: brotli.compress(body, quality=11)))
+    for suffix, encode in encoders:
+        target = path + suffix
+        if is_fresh(path, target):
+            continue
+        body = encode(data)
+        # Not worth serving if it barely shrinks
+        if len(body) >= len(data) * 0.95:
+            continue
+        with open(target, 'wb') as f:
+            f.write(body)
+        written.append(target)
+    return written
+
+def convert_image(path, formats):
+    """Write .webp/.avif variants of a PNG; returns the files written"""
+    written = []
+    base = os.path.splitext(path)[0]
+    for fmt in formats:
+        target = f"{base}.{fmt}"
+        if is_fresh(path, target):
+            continue
+        with Image.open(path) as img:
+            if fmt == 'webp':
+                # Lossless keeps chart text and lines crisp
+                img.save(target, 'WEBP', lossless=True, method=6)
+            else:
+                img.save(target, 'AVIF', quality=80)
+        if os.path.getsize(target) >= os.path.getsize(path):
+            os.remove(target)
+            continue
+        written.append(target)
+    return written
+
+def build(static_dir=STATIC_DIR):
+    """Write variants for every asset under ``static_dir``; returns the files written"""
+    formats = image_formats()
+    written = []
+    for root, _, files in os.walk(static_dir):
+        for name in sorted(files):
+            path = os.path.join(root, name)
+            ext = os.path.splitext(name)[1].lower()
+            if ext in COMPRESSIBLE_EXTENSIONS:
+                written.extend(compress_file(path))
+            elif ext == '.png' and formats:
+                written.extend(convert_image(path, formats))
+    return written
+
+if __name__ == '__main__':
+    static_dir = sys.argv[1] if len(sys.argv) > 1 else STATIC_DIR
+    if brotli is None:
+        print("brotli is not installed; skipping .br files")
+    if not image_formats():
+        print("Pillow with WebP/AVIF support is not available; skipping image variants")
+    written = build(static_dir)
+    print(f"Wrote {len(written)} static asset variants in {static_dir}")
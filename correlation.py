@@ -0,0 +1,149 @@
+"""Pairwise correlation matrices over a NumPy array with missing values.
+
+Every function takes a 2-D float array (rows are observations, columns are
+variables, NaN marks a missing value) and returns ``(corr, counts)``: the
+correlation matrix and the number of rows where both variables are present.
+Each pair uses its pairwise-complete observations, the same as
+``DataFrame.corr``, but Pearson is computed for all pairs at once with matrix
+products over the masked array instead of pair by pair.
+"""
+import numpy as np
+
+METHODS = ('pearson', 'spearman', 'kendall')
+
+# Kendall compares every pair of rows, so it is limited to this many observations
+KENDALL_MAX_ROWS = 20000
+
+def pairwise_pearson(X):
+    """Pearson correlation of every pair of columns in one vectorized pass"""
+    X = np.asarray(X, dtype=float)
+    present = ~np.isnan(X)
+    M = present.astype(float)
+
+    # Center each column first to keep the sums of squares well conditioned
+    center = np.where(present, X, 0.0).sum(axis=0) / np.maximum(present.sum(axis=0), 1)
+    Z = np.where(present, X - center, 0.0)
+
+    counts = M.T @ M                 # n_ij: rows where both i and j are present
+    sums = Z.T @ M                   # sum of x_i over rows where j is present
+    squares = (Z * Z).T @ M          # sum of x_i^2 over rows where j is present
+    products = Z.T @ Z               # sum of x_i * x_j over rows where both are present
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cov = products - sums * sums.T / counts
+        var_i = squares - sums * sums / counts
+        var_j = var_i.T
+        corr = cov / np.sqrt(var_i * var_j)
+    corr[(counts < 2) | (var_i <= 0) | (var_j <= 0)] = np.nan
+    return np.clip(corr, -1.0, 1.0), counts.astype(int)
+
+def rank(values):
+    """Average ranks (1-based) of a 1-D array without missing values, ties sharing their mean rank"""
+    order = np.argsort(values, kind='mergesort')
+    sorted_values = values[order]
+    # Start index of each run of equal values
+    starts = np.flatnonzero(np.r_[True, sorted_values[1:] != sorted_values[:-1]])
+    ends = np.r_[starts[1:], len(values)]
+    ranks = np.empty(len(values))
+    ranks[order] = np.repeat((starts + ends + 1) / 2.0, ends - starts)
+    return ranks
+
+def rank_columns(X):
+    """Rank each column over its present values, leaving NaN where values are missing"""
+    ranks = np.full(X.shape, np.nan)
+    for j in range(X.shape[1]):
+        present = ~np.isnan(X[:, j])
+        if present.any():
+            ranks[present, j] = rank(X[present, j])
+    return ranks
+
+def pairwise_spearman(X):
+    """Spearman correlation: Pearson over ranks within each pair's complete observations
+
+    Columns are ranked once and correlated in a single pass. Pairs where missing
+    values drop rows from either column are re-ranked on their shared rows,
+    which matches ``DataFrame.corr(method='spearman')``.
+    """
+    X = np.asarray(X, dtype=float)
+    present = ~np.isnan(X)
+    corr, counts = pairwise_pearson(rank_columns(X))
+
+    column_counts = present.sum(axis=0)
+    incomplete = (counts < column_counts[:, None]) | (counts < column_counts[None, :])
+    for i, j in zip(*np.nonzero(np.triu(incomplete, 1))):
+        both = present[:, i] & present[:, j]
+        if both.sum() < 2:
+            value = np.nan
+        else:
+            pair = np.column_stack([rank(X[both, i]), rank(X[both, j])])
+            value = pairwise_pearson(pair)[0][0, 1]
+        corr[i, j] = corr[j, i] = value
+    return corr, counts
+
+def kendall_tau(x, y, block=2048):
+    """Kendall's tau-b of two 1-D arrays without missing values"""
+    n = len(x)
+    if n < 2:
+        return np.nan
+    if n > KENDALL_MAX_ROWS:
+        raise ValueError(f"Kendall correlation is limited to {KENDALL_MAX_ROWS} rows")
+    # Sum of sign(x_a - x_b) * sign(y_a - y_b) over all ordered pairs, in blocks of rows
+    s = 0.0
+    for start in range(0, n, block):
+        dx = np.sign(x[start:start + block, None] - x[None, :])
+        dy = np.sign(y[start:start + block, None] - y[None, :])
+        s += np.sum(dx * dy)
+    s /= 2
+
+    pairs = n * (n - 1) / 2
+    ties_x = sum(t * (t - 1) / 2 for t in np.unique(x, return_counts=True)[1])
+    ties_y = sum(t * (t - 1) / 2 for t in np.unique(y, return_counts=True)[1])
+    denominator = np.sqrt((pairs - ties_x) * (pairs - ties_y))
+    return s / denominator if denominator > 0 else np.nan
+
+def pairwise_kendall(X):
+    """Kendall tau-b correlation of every pair of columns"""
+    X = np.asarray(X, dtype=float)
+    present = ~np.isnan(X)
+    p = X.shape[1]
+    counts = present.T.astype(int) @ present.astype(int)
+    corr = np.full((p, p), np.nan)
+    for i in range(p):
+        # Like DataFrame.corr, a column with any values has tau 1 with itself, even if constant
+        corr[i, i] = 1.0 if counts[i, i] else np.nan
+        for j in range(i + 1, p):
+            both = present[:, i] & present[:, j]
+            corr[i, j] = corr[j, i] = kendall_tau(X[both, i], X[both, j])
+    return corr, counts
+
+def pairwise_correlation(X, method='pearson', min_periods=1):
+    """Correlation matrix by ``method``, with NaN where fewer than ``min_periods`` rows overlap"""
+    if method == 'pearson':
+        corr, counts = pairwise_pearson(X)
+    elif method == 'spearman':
+        corr, counts = pairwise_spearman(X)
+    elif method == 'kendall':
+        corr, counts = pairwise_kendall(X)
+    else:
+        raise ValueError(f"Unknown correlation method: {method}")
+    corr = corr.copy()
+    corr[counts < max(min_periods, 1)] = np.nan
+    return corr, counts
+
+def correlation_tensor(X, groups, n_groups):
+    """Pearson correlation for the whole array and for each group of rows
+
+    ``groups`` holds each row's group number (0 to ``n_groups - 1``, or -1 for
+    none). Returns ``(corr, counts)`` shaped ``(n_groups + 1, p, p)``: index 0
+    is all rows, index ``g + 1`` is group ``g``.
+    """
+    X = np.asarray(X, dtype=float)
+    p = X.shape[1]
+    corr = np.full((n_groups + 1, p, p), np.nan)
+    counts = np.zeros((n_groups + 1, p, p), dtype=int)
+    corr[0], counts[0] = pairwise_pearson(X)
+    for g in range(n_groups):
+        rows = groups == g
+        if rows.any():
+            corr[g + 1], counts[g + 1] = pairwise_pearson(X[rows])
+    return corr, counts
@@ -0,0 +1,384 @@
+"""Loading the country dataset, with a memory-mapped columnar cache of the CSV.
+
+The CSV is read in chunks of rows. Each chunk is coerced to the column types in
+``SCHEMA`` and checked against its allowed ranges as it is read, so memory use
+while parsing stays bounded by the chunk size and the typed columns, and a
+data-quality report records what was missing, unparseable or out of range.
+
+Parsing and cleaning the CSV is done once by the ingest step, which writes every
+column as a typed ``.npy`` file (numeric columns keep their cleaned dtype, text
+columns are stored as categorical codes plus a category list). Workers then
+memory-map those files at startup, so they share pages through the OS page cache
+instead of each re-parsing the CSV. The CSV is used whenever the cache is stale
+or missing.
+
+Usage:
+    python datastore.py [path/to/country_data.csv]
+"""
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+DATA_FILE = os.path.join(DATA_DIR, 'country_data.csv')
+CACHE_DIR = os.path.join(DATA_DIR, 'cache')
+
+# Bump when the cache layout changes so old caches are ignored
+CACHE_FORMAT = 2
+
+# Rows parsed per chunk; peak memory while parsing is one chunk of text plus the typed columns
+INGEST_CHUNK_ROWS = int(os.environ.get('INGEST_CHUNK_ROWS', '100000'))
+
+# Expected columns: 'text' columns are stored as categoricals; 'int' columns are
+# whole numbers (int64 when no value is missing, float64 otherwise); 'float'
+# columns are float64. Numeric values outside [low, high] are treated as missing.
+Field = namedtuple('Field', ['name', 'kind', 'low', 'high'])
+
+SCHEMA = [
+    Field('Country', 'text', None, None),
+    Field('Code', 'text', None, None),
+    Field('Region', 'text', None, None),
+    Field('Population', 'int', 0, None),
+    Field('Area', 'int', 0, None),
+    Field('Pop. Density', 'float', 0, None),
+    Field('Coastline', 'float', 0, None),
+    Field('Net migration', 'float', None, None),
+    Field('Infant mortality', 'float', 0, 1000),
+    Field('GDP', 'float', 0, None),
+    Field('Literacy', 'float', 0, 100),
+    Field('Phones', 'float', 0, None),
+    Field('Arable', 'float', 0, 100),
+    Field('Crops', 'float', 0, 100),
+    Field('Other', 'float', 0, 100),
+    Field('Climate', 'float', 1, 4),
+    Field('Birthrate', 'float', 0, 1000),
+    Field('Deathrate', 'float', 0, 1000),
+    Field('Agriculture', 'float', 0, 1),
+    Field('Industry', 'float', 0, 1),
+    Field('Service', 'float', 0, 1),
+]
+
+# Columns that should be numeric, coercing errors to NaN
+NUMERIC_COLUMNS = [field.name for field in SCHEMA if field.kind != 'text']
+
+# Groups of columns that should add up to a total (within a tolerance) in rows where all are present
+SHARE_CHECKS = [
+    (('Agriculture', 'Industry', 'Service'), 1.0, 0.05),
+    (('Arable', 'Crops', 'Other'), 100.0, 0.5),
+]
+
+# Columns a dataset must have to be served
+REQUIRED_COLUMNS = ['Country', 'Region']
+
+def infer_field(name, sample):
+    """Schema entry for a column not in SCHEMA: numeric if the parser read ``sample`` as numbers"""
+    if pd.api.types.is_integer_dtype(sample.dtype):
+        return Field(name, 'int', None, None)
+    if pd.api.types.is_numeric_dtype(sample.dtype):
+        return Field(name, 'float', None, None)
+    return Field(name, 'text', None, None)
+
+class ColumnBuilder:
+    """Coerces one column chunk by chunk, keeping the typed chunks and validation counts"""
+
+    def __init__(self, field):
+        self.field = field
+        self.chunks = []
+        self.present = 0
+        self.missing = 0
+        self.invalid = 0
+        self.out_of_range = 0
+        self.low = None
+        self.high = None
+        # Text columns: each chunk's distinct values (its codes index into them)
+        self.uniques = []
+
+    def add(self, raw):
+        """Coerce and validate one chunk of parsed values; returns the typed values"""
+        field = self.field
+        if field.kind == 'text':
+            if pd.api.types.is_numeric_dtype(raw.dtype):
+                raw = raw.astype(str).where(raw.notna())
+            # Codes into this chunk's distinct values; finish() maps them to shared categories
+            codes, uniques = pd.factorize(raw)
+            values = codes.astype(np.int32)
+            self.uniques.append(uniques)
+            missing = int((codes < 0).sum())
+        else:
+            # The parser reads a chunk as text if any value in it isn't a number
+            values = np.array(pd.to_numeric(raw, errors='coerce'), dtype=float)
+            # Text that isn't a number (or is infinite) becomes missing
+            invalid = raw.notna().to_numpy() & ~np.isfinite(values)
+            values[invalid] = np.nan
+            self.invalid += int(invalid.sum())
+            outside = np.zeros(len(values), dtype=bool)
+            if field.low is not None:
+                outside |= values < field.low
+            if field.high is not None:
+                outside |= values > field.high
+            values[outside] = np.nan
+            self.out_of_range += int(outside.sum())
+            missing = int(np.isnan(values).sum())
+            if missing < len(values):
+                low, high = float(np.nanmin(values)), float(np.nanmax(values))
+                self.low = low if self.low is None else min(self.low, low)
+                self.high = high if self.high is None else max(self.high, high)
+        self.missing += missing
+        self.present += len(values) - missing
+        self.chunks.append(values)
+        return values
+
+    def finish(self):
+        """All chunks as one column, releasing the chunks"""
+        chunks, self.chunks = self.chunks, []
+        if self.field.kind == 'text':
+            uniques, self.uniques = self.uniques, []
+            if not chunks:
+                return pd.Series([], dtype='category')
+            # Category number of every chunk's distinct values, in order of first appearance
+            mapping, categories = pd.factorize(np.concatenate([np.asarray(u, dtype=object) for u in uniques]))
+            offsets = np.cumsum([0] + [len(u) for u in uniques])
+            codes = np.concatenate([
+                np.where(chunk >= 0, mapping[offsets[i] + np.maximum(chunk, 0)], -1).astype(np.int32)
+                for i, chunk in enumerate(chunks)])
+            del chunks
+            return pd.Series(pd.Categorical.from_codes(codes, categories=pd.Index(categories, dtype=object)))
+        values = np.concatenate(chunks) if chunks else np.empty(0)
+        del chunks
+        if self.field.kind == 'int' and self.missing == 0 and np.all(values == np.floor(values)):
+            values = values.astype(np.int64)
+        return pd.Series(values, copy=False)
+
+    def report(self):
+        entry = {'kind': self.field.kind, 'present': self.present, 'missing': self.missing}
+        if self.field.kind != 'text':
+            entry.update(invalid=self.invalid, out_of_range=self.out_of_range,
+                         min=self.low, max=self.high)
+        return entry
+
+def load_dataset(path, chunk_rows=INGEST_CHUNK_ROWS):
+    """Load, clean and validate the country dataset from a CSV file, one chunk of rows at a time
+
+    Every column is coerced to its SCHEMA type as each chunk is read, so only
+    one chunk of raw text is held in memory. Returns ``(frame, report)`` where
+    the report holds per-column and per-check data-quality counts.
+    """
+    started = time.perf_counter()
+    builders = None
+    checks = {' + '.join(columns): {'checked': 0, 'failed': 0} for columns, _, _ in SHARE_CHECKS}
+    rows = chunks = 0
+    schema = {field.name: field for field in SCHEMA}
+
+    # Text columns are read as strings; the parser reads the rest as numbers where it can
+    text_columns = {field.name: str for field in SCHEMA if field.kind == 'text'}
+    for chunk in pd.read_csv(path, dtype=text_columns, chunksize=chunk_rows):
+        if builders is None:
+            builders = {col: ColumnBuilder(schema.get(col) or infer_field(col, chunk[col]))
+                        for col in chunk.columns}
+        typed = {col: builder.add(chunk[col]) for col, builder in builders.items()}
+        rows += len(chunk)
+        chunks += 1
+
+        # Shares that should add up to a total, e.g. economic sectors to 1
+        for columns, total, tolerance in SHARE_CHECKS:
+            if all(col in typed for col in columns):
+                sums = np.sum([typed[col] for col in columns], axis=0)
+                checked = ~np.isnan(sums)
+                result = checks[' + '.join(columns)]
+                result['checked'] += int(checked.sum())
+                result['failed'] += int((np.abs(sums[checked] - total) > tolerance).sum())
+
+    if builders is None:
+        # Header only (or an empty file, which read_csv already rejects)
+        builders = {col: ColumnBuilder(schema.get(col) or Field(col, 'text', None, None))
+                    for col in pd.read_csv(path, nrows=0).columns}
+    frame = pd.DataFrame({col: builder.finish() for col, builder in builders.items()}, copy=False)
+
+    report = {
+        'rows': rows,
+        'chunks': chunks,
+        'chunk_rows': chunk_rows,
+        'seconds': round(time.perf_counter() - started, 4),
+        'columns': {col: builder.report() for col, builder in builders.items()},
+        'missing_columns': [field.name for field in SCHEMA if field.name not in builders],
+        'extra_columns': [col for col in builders if col not in schema],
+        'checks': {name: result for name, result in checks.items() if result['checked']},
+    }
+    return frame, report
+
+def validate_dataset(frame):
+    """Raise ValueError if a loaded dataset can't be served (no rows or missing required columns)"""
+    missing = [col for col in REQUIRED_COLUMNS if col not in frame.columns]
+    if missing:
+        raise ValueError(f"Dataset is missing required columns: {', '.join(missing)}")
+    if len(frame) == 0:
+        raise ValueError("Dataset has no rows")
+
+def quality_summary(report):
+    """One line per column or check with problems in a data-quality report"""
+    lines = []
+    for col, entry in report['columns'].items():
+        problems = []
+        if entry.get('invalid'):
+            problems.append(f"{entry['invalid']} not numeric")
+        if entry.get('out_of_range'):
+            problems.append(f"{entry['out_of_range']} out of range")
+        if problems:
+            lines.append(f"{col}: {', '.join(problems)} (treated as missing)")
+    for name, result in report['checks'].items():
+        if result['failed']:
+            lines.append(f"{name}: {result['failed']} of {result['checked']} rows don't add up")
+    if report['missing_columns']:
+        lines.append(f"Missing columns: {', '.join(report['missing_columns'])}")
+    return lines
+
+def file_signature(path):
+    """Cheap change detector for a file: (mtime, size), or None if it's missing"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+def dataset_version(path):
+    """Content hash of the data file, used as the dataset version"""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()[:16]
+
+def _pointer_path(cache_dir):
+    return os.path.join(cache_dir, 'current.json')
+
+def _read_manifest(target):
+    try:
+        with open(os.path.join(target, 'manifest.json')) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _cache_is_current(target):
+    manifest = _read_manifest(target)
+    return manifest is not None and manifest.get('format') == CACHE_FORMAT
+
+def write_dataset_cache(frame, version, signature, cache_dir=CACHE_DIR, report=None):
+    """Write ``frame`` (and its data-quality report) as a columnar cache for the given dataset version
+
+    Files go to a temporary directory that is renamed into place, so concurrent
+    writers (e.g. several workers booting at once) never expose a partial cache.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    target = os.path.join(cache_dir, version)
+
+    if not _cache_is_current(target):
+        # Clear out a cache written in an older format
+        if os.path.exists(target):
+            shutil.rmtree(target, ignore_errors=True)
+        tmp_dir = tempfile.mkdtemp(prefix=f'.{version}-', dir=cache_dir)
+        try:
+            columns = []
+            for i, col in enumerate(frame.columns):
+                series = frame[col]
+                entry = {'name': col, 'file': f'{i}.npy'}
+                if pd.api.types.is_numeric_dtype(series.dtype):
+                    np.save(os.path.join(tmp_dir, entry['file']), series.to_numpy())
+                    entry['kind'] = 'numeric'
+                else:
+                    categorical = pd.Categorical(series)
+                    np.save(os.path.join(tmp_dir, entry['file']), categorical.codes)
+                    entry['kind'] = 'categorical'
+                    entry['categories'] = [str(c) for c in categorical.categories]
+                columns.append(entry)
+
+            manifest = {'format': CACHE_FORMAT, 'version': version,
+                        'rows': len(frame), 'columns': columns, 'quality': report}
+            with open(os.path.join(tmp_dir, 'manifest.json'), 'w') as f:
+                json.dump(manifest, f)
+            os.rename(tmp_dir, target)
+        except OSError:
+            # Another process got there first
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            if not _cache_is_current(target):
+                raise
+
+    # Point the source file's current signature at this version
+    fd, tmp_pointer = tempfile.mkstemp(prefix='.current-', dir=cache_dir)
+    with os.fdopen(fd, 'w') as f:
+        json.dump({'version': version, 'signature': list(signature)}, f)
+    os.replace(tmp_pointer, _pointer_path(cache_dir))
+    return target
+
+def read_dataset_cache(version, cache_dir=CACHE_DIR):
+    """Memory-map the cached columns for ``version`` as ``(frame, report)``, or return None if there is no valid cache"""
+    target = os.path.join(cache_dir, version)
+    manifest = _read_manifest(target)
+    if manifest is None or manifest.get('format') != CACHE_FORMAT or manifest.get('version') != version:
+        return None
+
+    data = {}
+    for entry in manifest['columns']:
+        values = np.load(os.path.join(target, entry['file']), mmap_mode='r')
+        if entry['kind'] == 'categorical':
+            data[entry['name']] = pd.Series(
+                pd.Categorical.from_codes(values, categories=entry['categories']))
+        else:
+            # Wrap the memmap without copying so the pages stay shared
+            data[entry['name']] = pd.Series(values, copy=False)
+    return pd.DataFrame(data, copy=False), manifest.get('quality')
+
+def load_cached_dataset(path, cache_dir=CACHE_DIR):
+    """Load the dataset for ``path`` from the cache when it is current
+
+    Returns ``(frame, version, report)``, or None when the cache is stale or missing.
+    The source file is only hashed when its mtime/size differ from the ones
+    recorded for the cache.
+    """
+    signature = file_signature(path)
+    if signature is None:
+        return None
+    try:
+        with open(_pointer_path(cache_dir)) as f:
+            pointer = json.load(f)
+    except (OSError, ValueError):
+        pointer = {}
+
+    if tuple(pointer.get('signature', ())) == signature:
+        version = pointer['version']
+    else:
+        version = dataset_version(path)
+    cached = read_dataset_cache(version, cache_dir)
+    if cached is None:
+        return None
+    frame, report = cached
+    return frame, version, report
+
+def ingest(path=DATA_FILE, cache_dir=CACHE_DIR, chunk_rows=INGEST_CHUNK_ROWS):
+    """Parse the CSV once and write its columnar cache; returns ``(version, frame, report)``"""
+    signature = file_signature(path)
+    version = dataset_version(path)
+    frame, report = load_dataset(path, chunk_rows)
+    validate_dataset(frame)
+    write_dataset_cache(frame, version, signature, cache_dir, report)
+
+    # Drop caches for older versions of the data
+    for name in os.listdir(cache_dir):
+        entry = os.path.join(cache_dir, name)
+        if name != version and not name.startswith('.') and os.path.isdir(entry):
+            shutil.rmtree(entry, ignore_errors=True)
+    return version, frame, report
+
+if __name__ == '__main__':
+    source = sys.argv[1] if len(sys.argv) > 1 else DATA_FILE
+    version, frame, report = ingest(source)
+    print(f"Cached {source} ({frame.shape[0]} rows, {frame.shape[1]} columns) as version {version} in {CACHE_DIR}")
+    for line in quality_summary(report):
+        print(f"  {line}")
@@ -0,0 +1,242 @@
+"""Manifest of the pre-generated visualization images shown on /visualizations.
+
+The manifest records each image's category, title, description, dimensions and
+thumbnail. It is built once when the app starts and rebuilt by ``Gallery.refresh``
+when the images change, so the route never has to scan the directory.
+
+Running this module also writes the thumbnails (this needs Pillow):
+
+    python gallery.py
+"""
+import os
+import shutil
+import struct
+import sys
+import threading
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+STATIC_FOLDER = os.path.join(BASE_DIR, 'static', 'visualizations')
+THUMBNAIL_DIR = 'thumbnails'
+
+# Largest thumbnail edge in pixels (cards are about a third of the page wide)
+THUMBNAIL_SIZE = 640
+
+# Alternative paths to find the visualization images
+SOURCE_PATHS = [
+    os.path.join(os.path.dirname(BASE_DIR), 'static_visualizations', 'output_images'),
+    os.path.join(os.path.dirname(BASE_DIR), 'plots'),
+    os.path.join(os.path.dirname(os.path.dirname(BASE_DIR)), 'plots')
+]
+
+def collect_images(static_folder=STATIC_FOLDER):
+    """List the PNG images in the static folder, copying them in from the fallback locations if it is empty"""
+    os.makedirs(static_folder, exist_ok=True)
+    image_files = sorted(file for file in os.listdir(static_folder) if file.endswith('.png'))
+    if image_files:
+        return image_files
+
+    # If we don't have images in static directory, check other locations
+    source_paths = {}
+    for path in SOURCE_PATHS:
+        if os.path.exists(path):
+            for file in sorted(os.listdir(path)):
+                if file.endswith('.png') and file not in source_paths:
+                    source_paths[file] = os.path.join(path, file)
+
+    # Copy newly found images to the static folder
+    for img, src_path in source_paths.items():
+        dst = os.path.join(static_folder, img)
+        try:
+            shutil.copyfile(src_path, dst)
+            image_files.append(img)
+            print(f"Copied {img} to {dst}")
+        except Exception as e:
+            print(f"Error copying {img}: {str(e)}")
+    return image_files
+
+def png_size(path):
+    """(width, height) from a PNG file's header, or (None, None) if it can't be read"""
+    try:
+        with open(path, 'rb') as f:
+            header = f.read(24)
+    except OSError:
+        return None, None
+    if len(header) < 24 or header[:8] != b'\x89PNG\r\n\x1a\n':
+        return None, None
+    return struct.unpack('>II', header[16:24])
+
+def thumbnail_name(img):
+    return f"{THUMBNAIL_DIR}/{img}"
+
+def regional_description(img):
+    """Create descriptive text based on image content"""
+    if 'gdp_population' in img:
+        return "This visualization shows the relationship between GDP and population across different regions. Each point represents a country, with colors indicating different geographical regions."
+    elif 'gdp_literacy' in img:
+        return "Comparing GDP and literacy rates with region-based coloring. The plot reveals economic and educational patterns across different geographical areas."
+    elif 'birthrate' in img and 'histogram' in img:
+        return "Distribution of birthrates shown by region. The histogram displays how birthrates vary across different geographical areas."
+    elif 'Birthrate_vs_' in img or '_vs_Birthrate' in img:
+        return "Correlation between birthrate and other demographic indicators, color-coded by region to highlight geographic patterns."
+    elif 'economic_sectors' in img:
+        return "Breakdown of economic sectors (Agriculture, Industry, Service) by region, showing regional economic specialization patterns."
+    elif 'population_area' in img:
+        return "Relationship between country population and land area, colored by region to reveal geographic patterns in population density."
+    return "Regional analysis showing how patterns differ across geographic regions. The visualization uses color-coding to distinguish between different parts of the world."
+
+def distribution_description(img):
+    if 'birthrate' in img:
+        return "Distribution of birthrates across countries. This histogram shows how many countries fall into different birthrate ranges."
+    elif 'literacy' in img:
+        return "Distribution of literacy rates globally. The histogram reveals educational attainment patterns across countries."
+    elif 'population' in img:
+        return "Population distribution showing how country populations are distributed across different size categories."
+    return "Statistical distribution showing how countries are distributed across different value ranges for this demographic indicator."
+
+def correlation_description(img):
+    if 'correlation_matrix' in img:
+        return "Correlation matrix showing relationships between key demographic variables. Darker colors indicate stronger correlations."
+    elif 'Birthrate_vs_Infant' in img or 'Infant_vs_Birthrate' in img:
+        return "Relationship between birthrate and infant mortality. This scatter plot reveals how these two health indicators are connected."
+    elif 'GDP_vs_' in img or '_vs_GDP' in img:
+        return "Correlation between GDP and another demographic indicator, revealing economic relationships."
+    elif '_vs_' in img:
+        # Extract the two variables being compared
+        parts = img.split('_vs_')
+        var1 = parts[0].replace('_', ' ').title()
+        var2 = parts[1].split('_')[0].replace('_', ' ').title()
+        return f"Correlation analysis between {var1} and {var2}, showing how these two indicators relate to each other across countries."
+    return "Correlation analysis revealing relationships between demographic indicators."
+
+def categories(img):
+    """Gallery categories for an image file name (an image can be in more than one)"""
+    regional = 'by_region' in img or 'region' in img
+    found = []
+    if regional:
+        found.append('regional')
+    if ('histogram' in img or 'distribution' in img) and not regional:
+        found.append('distribution')
+    if 'correlation' in img or ('_vs_' in img and not regional):
+        found.append('correlation')
+    return found
+
+def build_manifest(static_folder=STATIC_FOLDER, url_prefix='/static/visualizations'):
+    """Build the gallery manifest: image entries grouped by category"""
+    manifest = {'regional': [], 'distribution': [], 'correlation': []}
+    thumbnails = os.path.join(static_folder, THUMBNAIL_DIR)
+
+    for img in collect_images(static_folder):
+        width, height = png_size(os.path.join(static_folder, img))
+        if os.path.exists(os.path.join(thumbnails, img)):
+            thumbnail_path = f"{url_prefix}/{thumbnail_name(img)}"
+        else:
+            thumbnail_path = f"{url_prefix}/{img}"
+
+        for category in categories(img):
+            if category == 'regional':
+                title = img.replace('_', ' ').replace('.png', '').replace('by region', '- Regional Analysis').title()
+                description = regional_description(img)
+            elif category == 'distribution':
+                title = img.replace('_', ' ').replace('.png', '').title()
+                description = distribution_description(img)
+            else:
+                title = img.replace('_', ' ').replace('.png', '').title()
+                description = correlation_description(img)
+            
+            manifest[category].append({
+                'file': img,
+                'category': category,
+                'title': title,
+                'image_path': f"{url_prefix}/{img}",
+                'thumbnail_path': thumbnail_path,
+                'description': description,
+                'width': width,
+                'height': height
+            })
+
+    regional = manifest['regional']
+    distribution = manifest['distribution']
+    correlation = manifest['correlation']
+
+    # For a better user experience, ensure we have at least some items in each category
+    if not regional and (distribution or correlation):
+        # Move some items to regional if empty
+        for i, viz in enumerate(correlation):
+            if 'region' in viz['title'].lower() or 'regional' in viz['title'].lower():
+                regional.append(correlation.pop(i))
+                break
+
+    if not distribution and (regional or correlation):
+        # Create a generic entry if we have no distributions
+        source = regional[0] if regional else correlation[0]
+        distribution.append(dict(source, category='distribution',
+                                 title='Statistical Distributions',
+                                 description='Statistical distributions showing how countries are distributed across different demographic indicators.'))
+
+    if not correlation and (regional or distribution):
+        # Create a generic entry if we have no correlations
+        source = regional[0] if regional else distribution[0]
+        correlation.append(dict(source, category='correlation',
+                                title='Variable Correlations',
+                                description='Correlation analysis showing relationships between different country indicators.'))
+
+    return manifest
+
+def folder_signature(static_folder=STATIC_FOLDER):
+    """Change detector for the images: name, mtime and size of each PNG plus the thumbnail folder's mtime"""
+    entries = []
+    for folder in (static_folder, os.path.join(static_folder, THUMBNAIL_DIR)):
+        try:
+            with os.scandir(folder) as it:
+                for entry in it:
+                    if entry.name.endswith('.png'):
+                        st = entry.stat()
+                        entries.append((folder, entry.name, st.st_mtime_ns, st.st_size))
+        except OSError:
+            pass
+    return tuple(sorted(entries))
+
+class Gallery:
+    """In-memory gallery manifest, rebuilt when the images on disk change"""
+
+    def __init__(self, static_folder=STATIC_FOLDER):
+        self.static_folder = static_folder
+        self.signature = None
+        self.manifest = {'regional': [], 'distribution': [], 'correlation': []}
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        """Rebuild the manifest if the images changed; returns True if it was rebuilt"""
+        with self._lock:
+            signature = folder_signature(self.static_folder)
+            if signature == self.signature:
+                return False
+            # Swap in a complete manifest so readers never see a partial one
+            self.manifest = build_manifest(self.static_folder)
+            self.signature = folder_signature(self.static_folder)
+            return True
+
+def write_thumbnails(static_folder=STATIC_FOLDER, size=THUMBNAIL_SIZE):
+    """Write a downscaled copy of each image to the thumbnail folder; returns the files written"""
+    from PIL import Image
+
+    thumbnails = os.path.join(static_folder, THUMBNAIL_DIR)
+    os.makedirs(thumbnails, exist_ok=True)
+    written = []
+    for img in collect_images(static_folder):
+        source = os.path.join(static_folder, img)
+        target = os.path.join(thumbnails, img)
+        if os.path.exists(target) and os.path.getmtime(target) >= os.path.getmtime(source):
+            continue
+        with Image.open(source) as image:
+            image.thumbnail((size, size))
+            image.save(target, 'PNG', optimize=True)
+        written.append(target)
+    return written
+
+if __name__ == '__main__':
+    static_folder = sys.argv[1] if len(sys.argv) > 1 else STATIC_FOLDER
+    written = write_thumbnails(static_folder)
+    manifest = build_manifest(static_folder)
+    counts = ', '.join(f"{len(items)} {category}" for category, items in manifest.items())
+    print(f"Wrote {len(written)} thumbnails in {os.path.join(static_folder, THUMBNAIL_DIR)}; gallery has {counts}")
@@ -0,0 +1,40 @@
+"""Gunicorn settings for serving the dashboard (read by `gunicorn --config gunicorn.conf.py app:app`)
+
+Workers are threaded (gthread) by default, so one slow client downloading a
+large response holds a thread rather than a whole worker process. The app is
+loaded once in the master process before the workers fork, so every worker
+starts from the same copy of the dataset and precomputed statistics, shared
+copy-on-write instead of loaded per worker.
+
+Set GUNICORN_WORKER_CLASS=sync to get one request per worker at a time.
+"""
+import gc
+import os
+
+# Threaded workers by default; 'sync' handles one request per worker at a time
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+
+# Worker processes (WEB_CONCURRENCY is set by Heroku and can be set on Render)
+workers = int(os.environ.get('WEB_CONCURRENCY', '2'))
+
+# Request threads per worker; gunicorn switches sync workers to gthread when this is above 1
+threads = int(os.environ.get('GUNICORN_THREADS', '8' if worker_class == 'gthread' else '1'))
+
+# Load the app and its data in the master, before forking the workers
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1').lower() in ('1', 'true', 'yes')
+
+# Seconds to keep an idle connection open for its next request (threaded workers only)
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', '5'))
+
+# Rendered plots can take up to app.RENDER_TIMEOUT seconds
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', '90'))
+
+def pre_fork(server, worker):
+    # Move the loaded objects out of the garbage collector's generations, so its
+    # passes in the workers don't write to (and so copy) the shared pages
+    gc.freeze()
+
+def post_fork(server, worker):
+    # Background threads (file watcher, render pool, profiler) start in each
+    # worker on first use; threads in the master don't survive the fork
+    server.log.info(f"Worker {worker.pid}: {worker_class}, {threads} thread(s), preloaded: {preload_app}")
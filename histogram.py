@@ -0,0 +1,102 @@
+"""Histogram binning over pre-sorted column values.
+
+Each numeric column's non-missing values are sorted once when the data loads,
+overall and within each region. Any histogram is then a ``searchsorted`` of the
+bin edges into the sorted values, and the statistics the binning strategies
+need (range, quantiles) are index lookups instead of full scans.
+"""
+import math
+
+import numpy as np
+
+# Binning strategies: equal-width bins, numpy's automatic bin-width rules, or equal-count bins
+STRATEGIES = ('width', 'auto', 'fd', 'sturges', 'quantile')
+
+# Upper limit on the number of bins, whether requested or chosen by a strategy
+MAX_BINS = 1000
+
+class SortedColumn:
+    """A numeric column's non-missing values, sorted overall and within each group"""
+
+    def __init__(self, values, groups, n_groups):
+        values = np.asarray(values, dtype=float)
+        present = ~np.isnan(values)
+        values = values[present]
+        groups = np.asarray(groups)[present]
+
+        self.all = np.sort(values)
+        # Sort by group, then by value, so each group is a contiguous sorted slice
+        order = np.lexsort((values, groups))
+        self.by_group = values[order]
+        self.offsets = np.searchsorted(groups[order], np.arange(n_groups + 1))
+
+    def values(self, group=None):
+        """Sorted values for all rows, or for one group"""
+        if group is None:
+            return self.all
+        return self.by_group[self.offsets[group]:self.offsets[group + 1]]
+
+def quantiles(sorted_values, q):
+    """Linearly interpolated quantiles of already sorted values (same as np.quantile)"""
+    position = np.asarray(q, dtype=float) * (len(sorted_values) - 1)
+    lower = np.floor(position).astype(int)
+    upper = np.minimum(lower + 1, len(sorted_values) - 1)
+    fraction = position - lower
+    return sorted_values[lower] + fraction * (sorted_values[upper] - sorted_values[lower])
+
+def bin_edges(sorted_values, bins=10, strategy='width'):
+    """Bin edges for sorted, non-empty values
+
+    'width' gives ``bins`` equal-width bins like ``np.histogram``; 'auto', 'fd'
+    and 'sturges' pick the bin width like ``np.histogram_bin_edges``;
+    'quantile' gives ``bins`` bins holding about the same number of values.
+    """
+    n = len(sorted_values)
+    lo, hi = float(sorted_values[0]), float(sorted_values[-1])
+
+    if strategy == 'quantile':
+        edges = np.unique(quantiles(sorted_values, np.linspace(0, 1, bins + 1)))
+        if len(edges) < 2:
+            edges = np.array([lo - 0.5, hi + 0.5])
+        return edges
+
+    spread = hi - lo
+    if lo == hi:
+        lo, hi = lo - 0.5, hi + 0.5
+
+    if strategy in ('auto', 'fd', 'sturges'):
+        sturges_width = spread / (math.log2(n) + 1.0)
+        q1, q3 = quantiles(sorted_values, [0.25, 0.75])
+        fd_width = 2.0 * (q3 - q1) * n ** (-1.0 / 3.0)
+        if strategy == 'sturges':
+            width = sturges_width
+        elif strategy == 'fd':
+            width = fd_width
+        else:
+            width = min(fd_width, sturges_width) if fd_width else sturges_width
+        bins = max(1, int(math.ceil((hi - lo) / width))) if width else 1
+        bins = min(bins, MAX_BINS)
+    elif strategy != 'width':
+        raise ValueError(f"Unknown binning strategy: {strategy}")
+
+    return np.linspace(lo, hi, bins + 1)
+
+def bin_counts(sorted_values, edges):
+    """Number of values in each bin; bins include their left edge, the last also its right edge"""
+    positions = np.searchsorted(sorted_values, edges, side='left')
+    positions[-1] = np.searchsorted(sorted_values, edges[-1], side='right')
+    return np.diff(positions)
+
+def histogram(sorted_values, bins=10, strategy='width', log=False):
+    """``(counts, edges)`` for sorted values, optionally binned on a log10 scale
+
+    On a log scale only positive values are counted and the edges are
+    returned in the original units.
+    """
+    if log:
+        sorted_values = np.log10(sorted_values[np.searchsorted(sorted_values, 0, side='right'):])
+    if len(sorted_values) == 0:
+        raise ValueError("No values to bin" + (" (a log scale needs positive values)" if log else ""))
+    edges = bin_edges(sorted_values, bins, strategy)
+    counts = bin_counts(sorted_values, edges)
+    return counts, (10.0 ** edges if log else edges)
@@ -0,0 +1,79 @@
+"""Matplotlib/seaborn rendering for /render/*.
+
+These functions run in the render worker processes. They take plain lists and
+arrays rather than the DataFrame so that only the data a plot needs is sent
+to the worker, and they return PNG bytes.
+
+Matplotlib and seaborn take a large share of startup time, so they are only
+imported by the first render, never when the app imports this module.
+"""
+import io
+
+import numpy as np
+
+_modules = None
+
+def _plotting():
+    """Import (once) and return the plotting modules: (pyplot, seaborn)"""
+    global _modules
+    if _modules is None:
+        import matplotlib
+        matplotlib.use('Agg')  # Use non-interactive backend
+        import matplotlib.pyplot as plt
+        import seaborn as sns
+        _modules = (plt, sns)
+    return _modules
+
+FIGSIZE = (10, 6)
+DPI = 100
+
+def _to_png(fig):
+    plt, _ = _plotting()
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format='png', dpi=DPI, bbox_inches='tight')
+    plt.close(fig)
+    return buffer.getvalue()
+
+def render_histogram(values, variable, title, bins=10):
+    """Histogram of one variable"""
+    plt, sns = _plotting()
+    fig, ax = plt.subplots(figsize=FIGSIZE)
+    sns.histplot(np.asarray(values, dtype=float), bins=bins, ax=ax, color='#4e73df')
+    ax.set_title(title)
+    ax.set_xlabel(variable)
+    ax.set_ylabel('Number of countries')
+    return _to_png(fig)
+
+def render_scatter(x, y, regions, x_var, y_var, title):
+    """Scatter plot of two variables with points colored by region"""
+    plt, sns = _plotting()
+    fig, ax = plt.subplots(figsize=FIGSIZE)
+    sns.scatterplot(x=np.asarray(x, dtype=float), y=np.asarray(y, dtype=float),
+                    hue=regions, ax=ax, s=50, alpha=0.8)
+    ax.set_title(title)
+    ax.set_xlabel(x_var)
+    ax.set_ylabel(y_var)
+    if ax.get_legend() is not None:
+        ax.legend(title='Region', bbox_to_anchor=(1.02, 1), loc='upper left', fontsize='small')
+    return _to_png(fig)
+
+def render_correlation(matrix, variables, title):
+    """Heatmap of a correlation matrix"""
+    plt, sns = _plotting()
+    size = max(6, 0.8 * len(variables) + 2)
+    fig, ax = plt.subplots(figsize=(size, size * 0.8))
+    sns.heatmap(np.asarray(matrix, dtype=float), xticklabels=variables, yticklabels=variables,
+                annot=len(variables) <= 12, fmt='.2f', cmap='coolwarm', vmin=-1, vmax=1,
+                square=True, ax=ax)
+    ax.set_title(title)
+    return _to_png(fig)
+
+RENDERERS = {
+    'histogram': render_histogram,
+    'scatter': render_scatter,
+    'correlation': render_correlation,
+}
+
+def render(kind, kwargs):
+    """Entry point for the worker processes: render one plot and return PNG bytes"""
+    return RENDERERS[kind](**kwargs)
@@ -0,0 +1,100 @@
+"""Opt-in sampling profiler for slow requests.
+
+While enabled, a background thread samples the Python stack of every thread
+that is handling a request every ``interval`` seconds. When a request finishes
+slower than the threshold, its samples are written in the folded-stack format
+(``frame;frame;frame count`` per line) that flamegraph.pl, speedscope and
+similar tools read. Sampling only looks at stacks, so it doesn't slow down the
+code being profiled the way a tracing profiler does.
+"""
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+
+class SamplingProfiler:
+    """Samples the stacks of registered threads and dumps the profiles of slow requests"""
+
+    def __init__(self, directory, threshold, interval=0.005, max_files=200):
+        self.directory = directory
+        self.threshold = threshold
+        self.interval = interval
+        self.max_files = max_files
+        self._active = {}
+        self._lock = threading.Lock()
+        self._thread_pid = None
+
+    def _ensure_thread(self):
+        # Threads don't survive a fork, so start one per worker process
+        if self._thread_pid != os.getpid():
+            with self._lock:
+                if self._thread_pid != os.getpid():
+                    threading.Thread(target=self._run, name='sampling-profiler', daemon=True).start()
+                    self._thread_pid = os.getpid()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                active = list(self._active.items())
+            if not active:
+                continue
+            frames = sys._current_frames()
+            for thread_id, samples in active:
+                frame = frames.get(thread_id)
+                if frame is not None:
+                    samples[folded_stack(frame)] += 1
+
+    def start(self):
+        """Start sampling the calling thread; returns a token for ``stop``"""
+        self._ensure_thread()
+        token = (threading.get_ident(), Counter())
+        with self._lock:
+            self._active[token[0]] = token[1]
+        return token
+
+    def stop(self, token, duration=0.0, label='request'):
+        """Stop sampling a thread; writes the profile if ``duration`` was over the threshold
+
+        Returns the path written, or None.
+        """
+        thread_id, samples = token
+        with self._lock:
+            if self._active.get(thread_id) is samples:
+                del self._active[thread_id]
+        if duration < self.threshold or not samples:
+            return None
+        return self.write(samples, duration, label)
+
+    def write(self, samples, duration, label):
+        os.makedirs(self.directory, exist_ok=True)
+        name = re.sub(r'[^A-Za-z0-9_.-]+', '_', label).strip('_') or 'request'
+        path = os.path.join(self.directory, f"{time.strftime('%Y%m%d-%H%M%S')}-{int(duration * 1000)}ms-{name}-{os.getpid()}.folded")
+        with open(path, 'w') as f:
+            for stack, count in samples.most_common():
+                f.write(f"{stack} {count}\n")
+        self._prune()
+        return path
+
+    def _prune(self):
+        """Keep only the newest ``max_files`` profiles"""
+        try:
+            names = sorted(name for name in os.listdir(self.directory) if name.endswith('.folded'))
+        except OSError:
+            return
+        for name in names[:-self.max_files]:
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                pass
+
+def folded_stack(frame):
+    """A stack as ``outermost;...;innermost`` with each frame written ``function (file:first line)``"""
+    parts = []
+    while frame is not None:
+        code = frame.f_code
+        parts.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ';'.join(reversed(parts))
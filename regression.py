@@ -0,0 +1,177 @@
+"""Precomputed regression summaries for every pair of numeric columns.
+
+``summarize_pairs`` fits an ordinary least squares line of y on x for every
+ordered pair of columns of a 2-D float array (NaN marks a missing value, and
+each pair uses the rows where both are present). Along with the fit it finds
+the rows whose residual is more than ``OUTLIER_Z`` residual standard
+deviations from the line, and a decimated set of rows for plotting large
+data: one row per occupied cell of a grid over the pair's range, plus the
+outliers. Pairs are independent, so with ``workers`` above one they are split
+across a process pool that reads the array from a memory-mapped file.
+
+The results are kept in a ``PairTable`` of flat NumPy arrays indexed by pair.
+"""
+import multiprocessing
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+# Pairs with more rows than this are decimated to about this many points
+MAX_POINTS = 2000
+
+# Residuals more than this many standard deviations from the fit are outliers,
+# and at most MAX_OUTLIERS of the largest are kept per pair
+OUTLIER_Z = 3.0
+MAX_OUTLIERS = 50
+
+# Below this many rows, starting worker processes costs more than it saves
+PARALLEL_MIN_ROWS = 200000
+
+def grid_sample(x, y, max_points=MAX_POINTS):
+    """Positions of one point in each occupied cell of a grid of about ``max_points`` cells over x and y"""
+    side = max(1, int(np.sqrt(max_points)))
+    cells = np.zeros(len(x), dtype=np.int64)
+    for values, scale in ((x, side), (y, 1)):
+        low, high = values.min(), values.max()
+        if high > low:
+            cell = ((values - low) * (side / (high - low))).astype(np.int64)
+            cells += np.minimum(cell, side - 1) * scale
+    # Any point represents its cell; with duplicate indices the assignment keeps one of them
+    representative = np.full(side * side, -1, dtype=np.int64)
+    representative[cells] = np.arange(len(x))
+    return np.sort(representative[representative >= 0])
+
+def fit_line(x, y):
+    """``(slope, intercept, residuals, residual standard deviation)`` of the OLS fit of y on x"""
+    x_mean, y_mean = x.mean(), y.mean()
+    dx, dy = x - x_mean, y - y_mean
+    sxx = dx @ dx
+    if sxx <= 0:
+        return np.nan, np.nan, None, np.nan
+    slope = (dx @ dy) / sxx
+    residuals = dy - slope * dx
+    residual_std = np.sqrt((residuals @ residuals) / (len(x) - 2)) if len(x) > 2 else np.nan
+    return slope, y_mean - slope * x_mean, residuals, residual_std
+
+def outlier_positions(residuals, residual_std):
+    """Positions of the largest residuals beyond OUTLIER_Z standard deviations, largest first"""
+    if residuals is None or not residual_std > 0:
+        return np.arange(0)
+    z = np.abs(residuals) / residual_std
+    positions = np.flatnonzero(z > OUTLIER_Z)
+    return positions[np.argsort(-z[positions], kind='stable')][:MAX_OUTLIERS]
+
+def summarize_pair(x, y, max_points=MAX_POINTS):
+    """Fits in both directions, outliers and plot points of one pair of columns
+
+    Returns ``(count, (slope, intercept, residual_std, outlier rows) of y on x,
+    the same of x on y, point rows)`` with rows as positions in the full columns.
+    """
+    rows = np.flatnonzero(~(np.isnan(x) | np.isnan(y)))
+    xv, yv = x[rows], y[rows]
+    fits = []
+    for a, b in ((xv, yv), (yv, xv)):
+        if len(rows) >= 2:
+            slope, intercept, residuals, residual_std = fit_line(a, b)
+            outliers = rows[outlier_positions(residuals, residual_std)]
+        else:
+            slope = intercept = residual_std = np.nan
+            outliers = np.arange(0)
+        fits.append((slope, intercept, residual_std, outliers))
+    if len(rows) > max_points:
+        points = np.union1d(rows[grid_sample(xv, yv, max_points)], np.concatenate([fit[3] for fit in fits]))
+    else:
+        points = rows
+    return len(rows), fits[0], fits[1], points
+
+def _summarize_batch(X, pairs, max_points):
+    return [(i, j, summarize_pair(X[:, i], X[:, j], max_points)) for i, j in pairs]
+
+def _summarize_file(path, pairs, max_points):
+    # Worker process: the array is shared through the page cache rather than pickled
+    return _summarize_batch(np.load(path, mmap_mode='r'), pairs, max_points)
+
+def summarize_pairs(X, variables, max_points=MAX_POINTS, workers=1):
+    """A ``PairTable`` for every ordered pair of the columns of ``X``, named ``variables``"""
+    # Column-major, so each column is contiguous
+    X = np.asfortranarray(X, dtype=float)
+    n = X.shape[1]
+    pairs = [(i, j) for i in range(n) for j in range(i + 1, n)]
+    workers = min(workers, os.cpu_count() or 1)
+    # Worker processes never start pools of their own
+    if workers > 1 and len(X) >= PARALLEL_MIN_ROWS and len(pairs) > 1 and multiprocessing.parent_process() is None:
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'values.npy')
+            np.save(path, X)
+            batches = [pairs[k::workers] for k in range(workers)]
+            with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+                results = [result for batch in pool.map(_summarize_file, [path] * workers, batches,
+                                                         [max_points] * workers)
+                           for result in batch]
+    else:
+        results = _summarize_batch(X, pairs, max_points)
+    return PairTable(variables, results)
+
+def _csr(lists, size):
+    """Offsets and concatenated values of ``size`` lists of rows, indexed by position"""
+    lengths = np.zeros(size, dtype=np.int64)
+    for key, rows in lists.items():
+        lengths[key] = len(rows)
+    offsets = np.concatenate([[0], np.cumsum(lengths)])
+    values = np.zeros(offsets[-1], dtype=np.int64)
+    for key, rows in lists.items():
+        values[offsets[key]:offsets[key + 1]] = rows
+    return offsets, values
+
+class PairTable:
+    """Fit, outliers and plot points of every ordered pair of variables, in flat arrays
+
+    ``count``, ``slope``, ``intercept`` and ``residual_std`` are ``(p, p)``
+    arrays indexed ``[x, y]`` for the fit of y on x. Outlier and point rows are
+    stored as offsets into one array per kind; points are shared by (x, y) and
+    (y, x).
+    """
+
+    def __init__(self, variables, results):
+        self.variables = list(variables)
+        self.index = {var: i for i, var in enumerate(self.variables)}
+        p = len(self.variables)
+        self.count = np.zeros((p, p), dtype=np.int64)
+        self.slope = np.full((p, p), np.nan)
+        self.intercept = np.full((p, p), np.nan)
+        self.residual_std = np.full((p, p), np.nan)
+        outliers, points = {}, {}
+        for i, j, (count, fit_xy, fit_yx, pair_points) in results:
+            for x, y, (slope, intercept, residual_std, pair_outliers) in ((i, j, fit_xy), (j, i, fit_yx)):
+                self.count[x, y] = count
+                self.slope[x, y] = slope
+                self.intercept[x, y] = intercept
+                self.residual_std[x, y] = residual_std
+                outliers[x * p + y] = pair_outliers
+            points[i * p + j] = pair_points
+        self.outlier_offsets, self.outlier_rows = _csr(outliers, p * p)
+        self.point_offsets, self.point_rows = _csr(points, p * p)
+
+    def __contains__(self, pair):
+        x, y = pair
+        return x in self.index and y in self.index and x != y
+
+    def _key(self, x, y):
+        return self.index[x] * len(self.variables) + self.index[y]
+
+    def fit(self, x, y):
+        """``(count, slope, intercept, residual_std)`` of the fit of y on x"""
+        i, j = self.index[x], self.index[y]
+        return int(self.count[i, j]), self.slope[i, j], self.intercept[i, j], self.residual_std[i, j]
+
+    def outliers(self, x, y):
+        """Rows furthest from the fit of y on x, largest residual first"""
+        key = self._key(x, y)
+        return self.outlier_rows[self.outlier_offsets[key]:self.outlier_offsets[key + 1]]
+
+    def points(self, x, y):
+        """Rows to plot for the pair, in ascending order: all rows with both values, or a decimated set"""
+        key = self._key(*sorted((x, y), key=self.index.get))
+        return self.point_rows[self.point_offsets[key]:self.point_offsets[key + 1]]
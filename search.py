@@ -0,0 +1,179 @@
+"""Country lookup, name search and nearest neighbours, over indexes built when the data loads.
+
+``CountryIndex`` keeps:
+
+- hash maps from each normalized country code and name to its row, for
+  constant-time lookups
+- the normalized names, and every word of every name, as sorted arrays, so a
+  prefix search is two binary searches
+- a trigram index of the names for fuzzy matches, scored by the Jaccard
+  similarity of the trigram sets
+- each numeric column standardized to z-scores, so the countries most similar
+  to one are a single vectorized distance computation over all rows
+
+Names are normalized by removing accents, case and repeated or surrounding
+whitespace, so "cote d'ivoire" finds "Côte d'Ivoire".
+"""
+import re
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+# Fuzzy matches need at least this Jaccard similarity of their trigrams
+MIN_FUZZY_SCORE = 0.3
+
+def normalize(text):
+    """``text`` without accents, case or extra whitespace"""
+    text = str(text)
+    if text.isascii():
+        return ' '.join(text.lower().split())
+    text = unicodedata.normalize('NFKD', text)
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return ' '.join(text.casefold().split())
+
+def trigram_ids(names):
+    """``(name positions, trigram ids)`` of the distinct trigrams of each normalized name
+
+    Names are padded so short ones have trigrams too, and each trigram of three
+    code points is packed into one integer, so the work is done in arrays.
+    """
+    padded = np.array([f"  {name} " if name else '' for name in names], dtype=str)
+    width = padded.dtype.itemsize // 4
+    if width < 3:
+        return np.arange(0), np.arange(0)
+    chars = padded.view(np.uint32).reshape(len(padded), width).astype(np.int64)
+    ids = (chars[:, :-2] << 42) | (chars[:, 1:-1] << 21) | chars[:, 2:]
+    # Trigrams running past the end of a name include a padding zero
+    valid = chars[:, 2:] != 0
+    rows = np.broadcast_to(np.arange(len(padded))[:, None], ids.shape)[valid]
+    ids = ids[valid]
+    order = np.lexsort((ids, rows))
+    rows, ids = rows[order], ids[order]
+    distinct = np.ones(len(ids), dtype=bool)
+    distinct[1:] = (rows[1:] != rows[:-1]) | (ids[1:] != ids[:-1])
+    return rows[distinct], ids[distinct]
+
+def _prefix_range(sorted_values, prefix):
+    """``(start, stop)`` of the entries of a sorted string array that start with ``prefix``"""
+    start = np.searchsorted(sorted_values, prefix, side='left')
+    stop = np.searchsorted(sorted_values, prefix + '\U0010ffff', side='left')
+    return start, stop
+
+class CountryIndex:
+    """Lookup, search and similarity indexes over the rows of one dataset"""
+
+    def __init__(self, names, codes=None, features=None, feature_names=()):
+        names = ['' if pd.isna(name) else normalize(name) for name in np.asarray(names, dtype=object).tolist()]
+        self.size = len(names)
+
+        # Hash maps; with duplicates the first row wins
+        self.by_name = {}
+        for row, name in enumerate(names):
+            if name:
+                self.by_name.setdefault(name, row)
+        self.by_code = {}
+        if codes is not None:
+            for row, code in enumerate(np.asarray(codes, dtype=object).tolist()):
+                if not pd.isna(code) and str(code).strip():
+                    self.by_code.setdefault(str(code).strip().upper(), row)
+
+        # Sorted names and sorted words of names, each with the row they came from
+        self.names = np.array(names, dtype=str)
+        order = np.argsort(self.names, kind='stable')
+        self.sorted_names, self.name_rows = self.names[order], order
+        words, word_rows = [], []
+        for row, name in enumerate(names):
+            for word in set(re.findall(r'\w+', name)):
+                words.append(word)
+                word_rows.append(row)
+        words = np.array(words, dtype=str)
+        order = np.argsort(words, kind='stable')
+        self.sorted_words, self.word_rows = words[order], np.array(word_rows, dtype=np.int64)[order]
+
+        # Rows of each trigram, as sorted trigram ids with offsets into one row array
+        rows, ids = trigram_ids(names)
+        self.trigram_sizes = np.bincount(rows, minlength=self.size)
+        order = np.argsort(ids, kind='stable')
+        self.trigram_keys, starts = np.unique(ids[order], return_index=True)
+        self.trigram_offsets = np.append(starts, len(ids))
+        self.trigram_rows = rows[order]
+
+        # Standardized features; NaN stays NaN and is skipped in distances
+        self.feature_names = list(feature_names)
+        self.features = None
+        if features is not None and len(self.feature_names):
+            features = np.asarray(features, dtype=float)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                mean = np.nanmean(features, axis=0)
+                std = np.nanstd(features, axis=0)
+                self.features = (features - mean) / np.where(std > 0, std, 1.0)
+
+    def lookup(self, key):
+        """Row of the country with this code or name (case- and accent-insensitive), or None"""
+        code = str(key).strip().upper()
+        if code in self.by_code:
+            return self.by_code[code]
+        return self.by_name.get(normalize(key))
+
+    def prefix(self, query, limit):
+        """Rows whose name, or a word of whose name, starts with ``query``: name matches first"""
+        query = normalize(query)
+        start, stop = _prefix_range(self.sorted_names, query)
+        rows = list(dict.fromkeys(self.name_rows[start:min(stop, start + limit)].tolist()))
+        if len(rows) < limit and ' ' not in query:
+            start, stop = _prefix_range(self.sorted_words, query)
+            # Words of one name can share a prefix, so look past ``limit`` for distinct rows
+            for row in self.word_rows[start:stop].tolist():
+                if row not in rows:
+                    rows.append(row)
+                    if len(rows) >= limit:
+                        break
+        return rows
+
+    def fuzzy(self, query, limit, min_score=MIN_FUZZY_SCORE):
+        """``(rows, scores)`` of the names most similar to ``query`` by trigram overlap, best first"""
+        _, query_ids = trigram_ids([normalize(query)])
+        keys, offsets = self.trigram_keys, self.trigram_offsets
+        positions = np.minimum(np.searchsorted(keys, query_ids), max(len(keys) - 1, 0))
+        positions = positions[keys[positions] == query_ids] if len(keys) else positions[:0]
+        if not len(positions):
+            return np.arange(0), np.zeros(0)
+        postings = [self.trigram_rows[offsets[p]:offsets[p + 1]] for p in positions.tolist()]
+        shared = np.bincount(np.concatenate(postings), minlength=self.size)
+        candidates = np.flatnonzero(shared)
+        sizes = self.trigram_sizes[candidates]
+        scores = shared[candidates] / (len(query_ids) + sizes - shared[candidates])
+        keep = scores >= min_score
+        candidates, scores = candidates[keep], scores[keep]
+        best = np.argsort(-scores, kind='stable')[:limit]
+        return candidates[best], scores[best]
+
+    def similar(self, row, k, features=None):
+        """``(rows, distances)`` of the ``k`` rows nearest to ``row`` over standardized features
+
+        Distances use the features both rows have, scaled up to all features so
+        rows missing some values aren't favoured. ``features`` selects columns
+        by name (default: all).
+        """
+        if self.features is None:
+            return np.arange(0), np.zeros(0)
+        values = self.features
+        if features is not None and list(features) != self.feature_names:
+            values = values[:, [self.feature_names.index(f) for f in features]]
+        # A difference is NaN when either value is missing; those count as zero
+        diff = values - values[row]
+        present = ~np.isnan(diff)
+        diff[~present] = 0.0
+        shared = present.sum(axis=1)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            distances = np.sqrt(np.einsum('ij,ij->i', diff, diff) * values.shape[1] / shared)
+        distances[shared == 0] = np.inf
+        distances[row] = np.inf
+        k = min(k, self.size - 1)
+        if k <= 0:
+            return np.arange(0), np.zeros(0)
+        nearest = np.argpartition(distances, k - 1)[:k]
+        nearest = nearest[np.argsort(distances[nearest], kind='stable')]
+        nearest = nearest[np.isfinite(distances[nearest])]
+        return nearest, distances[nearest]
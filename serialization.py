@@ -0,0 +1,109 @@
+"""JSON encoding of NumPy and pandas values for Flask responses.
+
+``DataJSONProvider`` serializes NumPy arrays and scalars and pandas Series,
+Index and DataFrame objects directly, so routes can put them in a response
+without converting them to lists first. Missing and non-finite values (NaN,
+infinity, None, NaT, pd.NA) become ``null``, found with one vectorized pass
+per array instead of a check per value.
+
+When orjson is installed it does the encoding: it writes NumPy arrays natively
+and non-finite floats as ``null``. Otherwise the standard library encoder is
+used. orjson writes non-ASCII text as UTF-8 rather than ``\\u`` escapes, which
+is equally valid JSON.
+"""
+import json
+import math
+
+import numpy as np
+import pandas as pd
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; the standard library encoder is used instead
+    orjson = None
+
+def json_values(values):
+    """An array, Series or Index as a (nested) list, with missing and non-finite values as None"""
+    if isinstance(values, (pd.Series, pd.Index)):
+        values = values.to_numpy()
+    values = np.asarray(values)
+    kind = values.dtype.kind
+    if kind in 'iub':
+        return values.tolist()
+    if kind == 'f':
+        missing = ~np.isfinite(values)
+    else:
+        missing = pd.isna(values)
+    if not missing.any():
+        return values.tolist()
+    values = values.astype(object)
+    values[missing] = None
+    return values.tolist()
+
+def json_records(frame):
+    """A DataFrame, or a dict of equal-length arrays, as a list of row dicts with missing values as None"""
+    columns = {col: json_values(frame[col]) for col in frame}
+    return [dict(zip(columns, row)) for row in zip(*columns.values())]
+
+def _default(obj):
+    if isinstance(obj, (np.ndarray, pd.Series, pd.Index)):
+        return json_values(obj)
+    if isinstance(obj, pd.DataFrame):
+        return json_records(obj)
+    if obj is pd.NA or obj is pd.NaT:
+        return None
+    if isinstance(obj, pd.Timestamp):
+        return obj.isoformat()
+    if isinstance(obj, np.generic):
+        value = obj.item()
+        if isinstance(value, float) and not math.isfinite(value):
+            return None
+        return value
+    return DefaultJSONProvider.default(obj)
+
+def _replace_non_finite(obj):
+    """``obj`` with NaN and infinite floats in its dicts, lists and tuples replaced by None"""
+    if isinstance(obj, float):
+        return obj if math.isfinite(obj) else None
+    if isinstance(obj, dict):
+        return {key: _replace_non_finite(value) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_replace_non_finite(value) for value in obj]
+    return obj
+
+class DataJSONProvider(DefaultJSONProvider):
+    """Flask's JSON provider, extended to NumPy and pandas values, with NaN and infinity as null"""
+
+    default = staticmethod(_default)
+
+    # Encode with orjson when it is installed
+    use_orjson = orjson is not None
+
+    def dumps(self, obj, **kwargs):
+        # Flask itself only passes indent or separators; anything else needs the json module
+        if self.use_orjson and set(kwargs) <= {'indent', 'separators', 'sort_keys'}:
+            option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+            if kwargs.get('sort_keys', self.sort_keys):
+                option |= orjson.OPT_SORT_KEYS
+            if kwargs.get('indent'):
+                option |= orjson.OPT_INDENT_2
+            return orjson.dumps(obj, default=self.default, option=option).decode('utf-8')
+
+        kwargs.setdefault('default', self.default)
+        kwargs.setdefault('ensure_ascii', self.ensure_ascii)
+        kwargs.setdefault('sort_keys', self.sort_keys)
+        kwargs.setdefault('allow_nan', False)
+        try:
+            return json.dumps(obj, **kwargs)
+        except ValueError as e:
+            # Arrays are cleaned by ``default``; only NaN or infinite Python floats
+            # elsewhere in the payload (e.g. a scalar result) get here
+            if kwargs['allow_nan'] or not str(e).startswith('Out of range float values'):
+                raise
+            return json.dumps(_replace_non_finite(obj), **kwargs)
+
+    def loads(self, s, **kwargs):
+        if self.use_orjson and not kwargs:
+            return orjson.loads(s)
+        return super().loads(s, **kwargs)
@@ -13,12 +13,12 @@ document.addEventListener('DOMContentLoaded', function() {
 
     async function initializePage() {
         try {
-            // Fetch the country data
+            // Check that country data is available (one name is enough)
             showLoadingIndicator('population-area-container');
             showLoadingIndicator('custom-scatter-container');
             showLoadingIndicator('correlation-matrix-container');
             
-            countryData = await fetchData('/api/countries');
+            countryData = await fetchData('/api/countries?fields=Country&limit=1');
             
             if (!countryData || !countryData.length) {
                 throw new Error('No country data available');
@@ -43,7 +43,7 @@ document.addEventListener('DOMContentLoaded', function() {
 
     async function initializePopulationAreaScatter() {
         try {
-            const scatterData = await fetchData('/api/scatter/Population/Area');
+            const scatterData = await fetchScatterData('Population', 'Area');
             
             if (!scatterData || !scatterData.data) {
                 throw new Error('Invalid scatter data for Population vs Area');
@@ -52,11 +52,8 @@ document.addEventListener('DOMContentLoaded', function() {
             // Clear loading indicator
             document.getElementById('population-area-container').innerHTML = '<canvas id="population-area-chart"></canvas>';
             
-            // Calculate correlation
-            const correlation = calculateCorrelation(
-                scatterData.data.map(d => d.Population),
-                scatterData.data.map(d => d.Area)
-            );
+            // Correlation computed by the server over all countries, not just the plotted points
+            const correlation = scatterData.correlation ?? null;
             
             // Create chart
             populationAreaChart = createScatterPlot(
@@ -125,7 +122,7 @@ document.addEventListener('DOMContentLoaded', function() {
             showLoadingIndicator('custom-scatter-container');
             
             // Fetch data for selected variables
-            const scatterData = await fetchData(`/api/scatter/${xVar}/${yVar}`);
+            const scatterData = await fetchScatterData(xVar, yVar);
             
             if (!scatterData || !scatterData.data) {
                 throw new Error(`Invalid scatter data for ${xVar} vs ${yVar}`);
@@ -134,11 +131,8 @@ document.addEventListener('DOMContentLoaded', function() {
             // Clear loading indicator
             document.getElementById('custom-scatter-container').innerHTML = '<canvas id="custom-scatter-chart"></canvas>';
             
-            // Calculate correlation
-            const correlation = calculateCorrelation(
-                scatterData.data.map(d => d[xVar]),
-                scatterData.data.map(d => d[yVar])
-            );
+            // Correlation computed by the server over all countries, not just the plotted points
+            const correlation = scatterData.correlation ?? null;
             
             // Update correlation display
             document.getElementById('correlation-value').innerHTML = formatCorrelation(correlation);
@@ -241,47 +235,31 @@ document.addEventListener('DOMContentLoaded', function() {
         }
     }
 
-    // Helper function to calculate Pearson correlation coefficient
-    function calculateCorrelation(x, y) {
-        const n = x.length;
-        if (n !== y.length || n === 0) return 0;
-        
-        // Filter out any non-numeric values
-        const validPairs = [];
-        for (let i = 0; i < n; i++) {
-            if (!isNaN(x[i]) && !isNaN(y[i]) && x[i] !== null && y[i] !== null) {
-                validPairs.push([x[i], y[i]]);
-            }
+    // Fetch plottable scatter points (decimated for large data) in the compact columnar format and convert them to rows
+    async function fetchScatterData(xVar, yVar) {
+        const response = await fetchData(`/api/scatter/${encodeURIComponent(xVar)}/${encodeURIComponent(yVar)}?format=columns&dropna=1&decimate=1`);
+        if (!response || !response.data) {
+            return response;
         }
         
-        if (validPairs.length < 2) return null; // Not enough data for correlation
-        
-        // Calculate means
-        let sumX = 0, sumY = 0;
-        for (const [xi, yi] of validPairs) {
-            sumX += xi;
-            sumY += yi;
+        // Static exports ignore the query string and serve the default row format
+        if (Array.isArray(response.data)) {
+            const rows = response.data.filter(row => row[xVar] !== null && row[yVar] !== null);
+            return { data: rows, correlation: response.correlation };
         }
         
-        const meanX = sumX / validPairs.length;
-        const meanY = sumY / validPairs.length;
-        
-        // Calculate correlation coefficient
-        let numerator = 0;
-        let denomX = 0;
-        let denomY = 0;
-        
-        for (const [xi, yi] of validPairs) {
-            const diffX = xi - meanX;
-            const diffY = yi - meanY;
-            numerator += diffX * diffY;
-            denomX += diffX * diffX;
-            denomY += diffY * diffY;
+        const columns = Object.keys(response.data);
+        const length = columns.length ? response.data[columns[0]].length : 0;
+        const rows = new Array(length);
+        for (let i = 0; i < length; i++) {
+            const row = {};
+            columns.forEach(column => {
+                row[column] = response.data[column][i];
+            });
+            rows[i] = row;
         }
         
-        if (denomX === 0 || denomY === 0) return null; // Avoid division by zero
-        
-        return numerator / Math.sqrt(denomX * denomY);
+        return { data: rows, correlation: response.correlation };
     }
 
     // Function to create a scatter plot with points colored by region
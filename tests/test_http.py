@@ -0,0 +1,329 @@
+"""Checks of the HTTP behaviour of the app through Flask's test client.
+
+Run with `python -m pytest tests`. Covers conditional GETs, compression
+negotiation, streamed country lists, dataset reloads and the plot render
+pool, against the bundled data/country_data.csv. Reloads work on a copy of
+the CSV, with the columnar cache in a temporary directory.
+"""
+import functools
+import gzip
+import json
+import os
+import shutil
+import signal
+import sys
+import time
+
+import numpy as np
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+import app as dashboard
+import datastore
+
+
+@pytest.fixture
+def client(monkeypatch):
+    # No background watcher, so reloads only happen when a test asks for one
+    monkeypatch.setattr(dashboard, 'watcher_pid', os.getpid())
+    return dashboard.app.test_client()
+
+
+@pytest.fixture
+def data_copy(monkeypatch, tmp_path):
+    """Serve a copy of the CSV that tests may edit; returns its path"""
+    path = str(tmp_path / 'country_data.csv')
+    shutil.copyfile(datastore.DATA_FILE, path)
+    cache_dir = str(tmp_path / 'cache')
+    monkeypatch.setattr(dashboard, 'load_cached_dataset',
+                        functools.partial(datastore.load_cached_dataset, cache_dir=cache_dir))
+    monkeypatch.setattr(dashboard, 'write_dataset_cache',
+                        functools.partial(datastore.write_dataset_cache, cache_dir=cache_dir))
+    cache = dashboard.StatsCache(path, check_interval=0)
+    cache.load()
+    monkeypatch.setattr(dashboard, 'stats_cache', cache)
+    return path
+
+
+def edit_csv(path, old, new):
+    """Replace the first ``old`` in the file and move its mtime on, so the change is noticed"""
+    with open(path, encoding='utf-8') as f:
+        text = f.read()
+    assert old in text
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text.replace(old, new, 1))
+    later = time.time() + 10
+    os.utime(path, (later, later))
+
+
+# ----- ETags and conditional GETs -----
+
+def test_api_etag_and_not_modified(client):
+    response = client.get('/api/histogram/GDP')
+    assert response.status_code == 200
+    etag = response.headers['ETag']
+    assert response.headers['Cache-Control'] == f"public, max-age={dashboard.API_CACHE_MAX_AGE}"
+
+    repeat = client.get('/api/histogram/GDP', headers={'If-None-Match': etag})
+    assert repeat.status_code == 304
+    assert repeat.data == b''
+    assert repeat.headers['ETag'] == etag
+
+    other = client.get('/api/histogram/GDP?bins=5', headers={'If-None-Match': etag})
+    assert other.status_code == 200
+    assert other.headers['ETag'] != etag
+
+
+def test_etag_per_content_encoding(client):
+    response = client.get('/api/countries', headers={'Accept-Encoding': 'gzip'})
+    etag = response.headers['ETag']
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert etag.endswith('-gzip"')
+    response.close()
+
+    repeat = client.get('/api/countries', headers={'Accept-Encoding': 'gzip', 'If-None-Match': etag})
+    assert repeat.status_code == 304
+    assert 'Accept-Encoding' in repeat.headers['Vary']
+    # The uncompressed representation has a tag of its own
+    plain = client.get('/api/countries', headers={'Accept-Encoding': 'identity'})
+    assert plain.headers['ETag'] != etag
+    plain.close()
+
+
+def test_errors_are_not_cached(client):
+    response = client.get('/api/histogram/Nowhere')
+    assert response.status_code == 400
+    assert 'ETag' not in response.headers
+
+
+def test_render_etag(client, render_cache):
+    response = client.get('/render/histogram/GDP', headers={'If-None-Match': 'nothing'})
+    etag = response.headers['ETag']
+    repeat = client.get('/render/histogram/GDP', headers={'If-None-Match': etag})
+    assert repeat.status_code == 304
+
+
+# ----- Compression -----
+
+def test_json_gzip_matches_identity(client):
+    plain = client.get('/api/scatter/GDP/Literacy', headers={'Accept-Encoding': 'identity'})
+    assert 'Content-Encoding' not in plain.headers
+    assert 'Accept-Encoding' in plain.headers['Vary']
+    packed = client.get('/api/scatter/GDP/Literacy', headers={'Accept-Encoding': 'gzip'})
+    assert packed.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(packed.data) == plain.data
+
+
+def test_json_brotli_matches_identity(client):
+    brotli = pytest.importorskip('brotli')
+    plain = client.get('/api/countries', headers={'Accept-Encoding': 'identity'})
+    packed = client.get('/api/countries', headers={'Accept-Encoding': 'gzip, br'})
+    assert packed.headers['Content-Encoding'] == 'br'
+    assert brotli.decompress(packed.data) == plain.data
+
+
+def test_small_responses_stay_uncompressed(client):
+    response = client.get('/api/countries/FRA', headers={'Accept-Encoding': 'gzip'})
+    assert response.status_code == 200
+    assert len(response.data) < dashboard.COMPRESS_MIN_SIZE
+    assert 'Content-Encoding' not in response.headers
+
+
+@pytest.fixture
+def static_dir(monkeypatch, tmp_path):
+    """A static folder holding app.js and logo.png, each with a newer variant as build_static.py writes them"""
+    (tmp_path / 'app.js').write_text('console.log("dashboard");\n' * 100)
+    (tmp_path / 'app.js.gz').write_bytes(gzip.compress((tmp_path / 'app.js').read_bytes()))
+    (tmp_path / 'logo.png').write_bytes(b'png')
+    (tmp_path / 'logo.webp').write_bytes(b'webp')
+    earlier = time.time() - 60
+    for name in ('app.js', 'logo.png'):
+        os.utime(tmp_path / name, (earlier, earlier))
+    monkeypatch.setattr(dashboard.app, 'static_folder', str(tmp_path))
+    return tmp_path
+
+
+def test_static_precompressed_variant(client, static_dir):
+    response = client.get('/static/app.js', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'javascript' in response.mimetype
+    assert gzip.decompress(response.data) == (static_dir / 'app.js').read_bytes()
+    assert 'Accept-Encoding' in response.headers['Vary']
+    response.close()
+
+    plain = client.get('/static/app.js', headers={'Accept-Encoding': 'identity'})
+    assert 'Content-Encoding' not in plain.headers
+    assert plain.data == (static_dir / 'app.js').read_bytes()
+    plain.close()
+
+
+def test_static_image_variant(client, static_dir):
+    response = client.get('/static/logo.png', headers={'Accept': 'image/webp,*/*'})
+    assert response.mimetype == 'image/webp'
+    assert 'Accept' in response.headers['Vary']
+    response.close()
+    response = client.get('/static/logo.png', headers={'Accept': '*/*'})
+    assert response.data == b'png'
+    response.close()
+
+
+def test_static_stale_variant_is_skipped(client, static_dir):
+    (static_dir / 'app.js').write_text('console.log("edited");\n')
+    response = client.get('/static/app.js', headers={'Accept-Encoding': 'gzip'})
+    assert 'Content-Encoding' not in response.headers
+    assert response.data == b'console.log("edited");\n'
+    response.close()
+
+
+def test_static_variants_not_served_directly(client, static_dir):
+    assert client.get('/static/app.js.gz').status_code == 404
+    assert client.get('/static/logo.webp').status_code == 404
+
+
+# ----- Streamed country lists -----
+
+def test_countries_stream_all_rows(client):
+    frame = dashboard.stats_cache.snapshot.frame
+    response = client.get('/api/countries')
+    assert 'Content-Length' not in response.headers
+    rows = json.loads(response.data)
+    assert int(response.headers['X-Total-Count']) == len(rows) == len(frame)
+    assert [row['Country'] for row in rows] == frame['Country'].tolist()
+
+
+def test_countries_ndjson_matches_json(client):
+    rows = json.loads(client.get('/api/countries?fields=Country,GDP').data)
+    response = client.get('/api/countries?fields=Country,GDP&format=ndjson')
+    assert response.mimetype == 'application/x-ndjson'
+    lines = response.data.decode('utf-8').splitlines()
+    assert [json.loads(line) for line in lines] == rows
+    assert set(rows[0]) == {'Country', 'GDP'}
+
+
+def test_countries_pagination(client):
+    rows = json.loads(client.get('/api/countries?fields=Country').data)
+    page = client.get('/api/countries?fields=Country&offset=20&limit=15')
+    assert json.loads(page.data) == rows[20:35]
+    assert page.headers['X-Total-Count'] == str(len(rows))
+    assert json.loads(client.get(f'/api/countries?offset={len(rows)}').data) == []
+
+
+def test_countries_region_filter(client):
+    frame = dashboard.stats_cache.snapshot.frame
+    response = client.get('/api/countries?region=%20OCEANIA%20&fields=Country')
+    expected = frame.loc[frame['Region'].astype(str).str.strip() == 'OCEANIA', 'Country'].tolist()
+    assert [row['Country'] for row in json.loads(response.data)] == expected
+
+
+@pytest.mark.parametrize('query', ['region=Nowhere', 'format=csv', 'limit=-1', 'offset=x', 'fields=Nowhere'])
+def test_countries_rejects_invalid(client, query):
+    assert client.get(f'/api/countries?{query}').status_code == 400
+
+
+def test_stream_records_chunks_join_up(client):
+    frame = dashboard.stats_cache.snapshot.frame
+    positions = np.arange(len(frame))
+    fields = ['Country', 'Population', 'GDP']
+    with dashboard.app.test_request_context():
+        whole = ''.join(dashboard.stream_records(frame, fields, positions, chunk_rows=len(frame)))
+        chunked = list(dashboard.stream_records(frame, fields, positions, chunk_rows=7))
+        lines = ''.join(dashboard.stream_records(frame, fields, positions, 'ndjson', chunk_rows=7))
+    assert len(chunked) > 30
+    assert ''.join(chunked) == whole
+    assert [json.loads(line) for line in lines.splitlines()] == json.loads(whole)
+
+
+# ----- Dataset reloads -----
+
+def test_reload_publishes_new_version(client, data_copy):
+    before = client.get('/api/countries/FRA')
+    old_version = dashboard.stats_cache.version
+    edit_csv(data_copy, 'France,', 'Francia,')
+
+    assert dashboard.reload_dataset()
+    assert dashboard.stats_cache.version != old_version
+    assert client.get('/api/countries/FRA').get_json()['Country'] == 'Francia'
+    # Tags from the old data no longer match
+    assert client.get('/api/countries/FRA', headers={'If-None-Match': before.headers['ETag']}).status_code == 200
+
+
+def test_unchanged_file_is_not_reloaded(data_copy):
+    snapshot = dashboard.stats_cache.snapshot
+    later = time.time() + 10
+    os.utime(data_copy, (later, later))
+    assert not dashboard.reload_dataset()
+    assert dashboard.stats_cache.snapshot is snapshot
+
+
+def test_failed_reload_keeps_serving(client, data_copy):
+    snapshot = dashboard.stats_cache.snapshot
+    with open(data_copy, 'w') as f:
+        f.write('not,a\nvalid,dataset\n')
+    later = time.time() + 10
+    os.utime(data_copy, (later, later))
+
+    assert not dashboard.reload_dataset()
+    assert dashboard.stats_cache.snapshot is snapshot
+    assert dashboard.stats_cache.last_error
+    assert client.get('/api/countries/FRA').status_code == 200
+
+
+def test_request_keeps_its_snapshot(data_copy):
+    with dashboard.app.test_request_context('/api/countries'):
+        pinned = dashboard.current_snapshot()
+        edit_csv(data_copy, 'France,', 'Francia,')
+        assert dashboard.reload_dataset()
+        assert dashboard.current_snapshot() is pinned
+        assert dashboard.stats_cache.snapshot is not pinned
+
+
+# ----- Admin routes -----
+
+def test_admin_routes_need_a_token(client, monkeypatch):
+    monkeypatch.setattr(dashboard, 'ADMIN_TOKEN', None)
+    assert client.get('/admin/dataset').status_code == 404
+    assert client.get('/metrics').status_code == 404
+
+    monkeypatch.setattr(dashboard, 'ADMIN_TOKEN', 'secret')
+    assert client.get('/metrics').status_code == 401
+    assert client.get('/metrics', headers={'Authorization': 'Bearer wrong'}).status_code == 401
+    assert client.get('/metrics', headers={'Authorization': 'Bearer secret'}).status_code == 200
+    status = client.get('/admin/dataset', headers={'Authorization': 'Bearer secret'}).get_json()
+    assert status['file'] == os.path.basename(datastore.DATA_FILE)
+
+
+# ----- Plot rendering -----
+
+@pytest.fixture
+def render_cache(monkeypatch, tmp_path):
+    """An empty render cache, so every new plot is rendered in the pool"""
+    pytest.importorskip('matplotlib')
+    cache = dashboard.RenderCache(str(tmp_path / 'renders'), 8)
+    monkeypatch.setattr(dashboard, 'render_cache', cache)
+    return cache
+
+
+def kill_render_workers():
+    pool = dashboard.render_worker_pool()
+    for pid in list(pool._processes):
+        os.kill(pid, signal.SIGKILL)
+    return pool
+
+
+def test_render_pool_recovers_after_worker_dies(client, render_cache):
+    assert client.get('/render/histogram/GDP?bins=12').status_code == 200
+    pool = kill_render_workers()
+    time.sleep(0.5)
+
+    response = client.get('/render/histogram/GDP?bins=13')
+    assert response.status_code == 200
+    assert response.data.startswith(b'\x89PNG')
+    assert dashboard.render_worker_pool() is not pool
+    assert client.get('/render/scatter/GDP/Literacy').status_code == 200
+
+
+def test_render_region_and_limits(client, render_cache):
+    assert client.get('/render/histogram/GDP?region=OCEANIA').status_code == 200
+    assert client.get('/render/histogram/GDP?region=Nowhere').status_code == 400
+    assert client.get(f'/render/histogram/GDP?bins={dashboard.HISTOGRAM_MAX_BINS + 1}').status_code == 400
@@ -0,0 +1,330 @@
+"""Checks of the vectorized statistics against the pandas and NumPy results they replace.
+
+Run with `python -m pytest tests`. Each test uses the bundled
+data/country_data.csv, plus small arrays for edge cases (missing values,
+a single row, a region with no countries).
+"""
+import os
+import re
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from datastore import DATA_FILE, load_dataset
+from correlation import pairwise_correlation, correlation_tensor
+from histogram import SortedColumn, histogram, quantiles
+from aggregate import GroupIndex, aggregate, parse_metric
+from search import MIN_FUZZY_SCORE, CountryIndex, normalize
+
+
+@pytest.fixture(scope='module')
+def frame():
+    frame, _ = load_dataset(DATA_FILE)
+    return frame
+
+
+@pytest.fixture(scope='module')
+def numeric(frame):
+    return frame.select_dtypes(include=[np.number]).columns.tolist()
+
+
+@pytest.fixture(scope='module')
+def regions(frame):
+    """Sorted region names and each row's index into them (-1 if missing), as the app builds them"""
+    names = sorted(frame['Region'].dropna().unique().tolist())
+    return names, np.asarray(pd.Categorical(frame['Region'], categories=names).codes, dtype=np.int64)
+
+
+def pandas_corr(data, method, **kwargs):
+    # pandas computes Kendall with scipy, which the app doesn't need
+    if method == 'kendall':
+        pytest.importorskip('scipy')
+    return data.corr(method=method, **kwargs)
+
+
+def assert_matches(actual, expected):
+    np.testing.assert_allclose(np.asarray(actual, dtype=float), np.asarray(expected, dtype=float),
+                               rtol=1e-9, atol=1e-12, equal_nan=True)
+
+
+# ----- Correlation -----
+
+@pytest.mark.parametrize('method', ['pearson', 'spearman', 'kendall'])
+def test_correlation_matches_pandas(frame, numeric, method):
+    corr, counts = pairwise_correlation(frame[numeric].to_numpy(dtype=float), method)
+    assert_matches(corr, pandas_corr(frame[numeric], method))
+    present = frame[numeric].notna().to_numpy(dtype=int)
+    np.testing.assert_array_equal(counts, present.T @ present)
+
+
+@pytest.mark.parametrize('method', ['pearson', 'spearman', 'kendall'])
+def test_correlation_min_periods_matches_pandas(frame, numeric, method):
+    corr, _ = pairwise_correlation(frame[numeric].to_numpy(dtype=float), method, min_periods=215)
+    assert_matches(corr, pandas_corr(frame[numeric], method, min_periods=215))
+
+
+@pytest.mark.parametrize('method', ['pearson', 'spearman', 'kendall'])
+def test_correlation_missing_and_constant_columns(method):
+    data = pd.DataFrame({
+        'a': [1.0, 2.0, np.nan, 4.0, 5.0, 3.0],
+        'b': [2.0, np.nan, 1.0, 8.0, 9.0, 9.0],
+        'missing': np.nan,
+        'constant': 7.0,
+        'one': [np.nan, np.nan, 3.0, np.nan, np.nan, np.nan],
+    })
+    corr, counts = pairwise_correlation(data.to_numpy(dtype=float), method)
+    assert_matches(corr, pandas_corr(data, method))
+    assert counts[0, 1] == 4
+    assert counts[2].sum() == 0
+
+
+@pytest.mark.parametrize('method', ['pearson', 'spearman', 'kendall'])
+def test_correlation_single_row(method):
+    data = pd.DataFrame([[1.0, 2.0, 3.0]], columns=['a', 'b', 'c'])
+    corr, counts = pairwise_correlation(data.to_numpy(dtype=float), method)
+    assert_matches(corr, pandas_corr(data, method))
+    assert np.isnan(corr[~np.eye(3, dtype=bool)]).all()
+    np.testing.assert_array_equal(counts, np.ones((3, 3)))
+
+
+def test_correlation_tensor_per_region(frame, numeric, regions):
+    names, codes = regions
+    # One more group than there are regions: a region no country is in
+    corr, counts = correlation_tensor(frame[numeric].to_numpy(dtype=float), codes, len(names) + 1)
+    assert_matches(corr[0], frame[numeric].corr())
+    for g, name in enumerate(names):
+        assert_matches(corr[g + 1], frame.loc[codes == g, numeric].corr())
+    assert np.isnan(corr[len(names) + 1]).all()
+    assert not counts[len(names) + 1].any()
+
+
+# ----- Histograms -----
+
+@pytest.mark.parametrize('column', ['GDP', 'Literacy', 'Population', 'Climate'])
+@pytest.mark.parametrize('strategy, numpy_bins', [('width', 10), ('width', 37), ('auto', 'auto'),
+                                                  ('fd', 'fd'), ('sturges', 'sturges')])
+def test_histogram_matches_numpy(frame, column, strategy, numpy_bins):
+    values = frame[column].dropna().to_numpy(dtype=float)
+    bins = numpy_bins if strategy == 'width' else 10
+    counts, edges = histogram(np.sort(values), bins, strategy)
+    if numpy_bins == 'auto':
+        # 'auto' is the narrower of 'fd' and 'sturges', as in NumPy before 2.1 (the pinned
+        # version); later versions also cap the number of 'fd' bins
+        fd, sturges = np.histogram_bin_edges(values, 'fd'), np.histogram_bin_edges(values, 'sturges')
+        numpy_bins = fd if len(fd) > len(sturges) else sturges
+    expected_counts, expected_edges = np.histogram(values, bins=numpy_bins)
+    np.testing.assert_array_equal(counts, expected_counts)
+    assert_matches(edges, expected_edges)
+
+
+@pytest.mark.parametrize('column', ['GDP', 'Literacy', 'Climate'])
+def test_quantile_histogram_matches_numpy(frame, column):
+    values = frame[column].dropna().to_numpy(dtype=float)
+    counts, edges = histogram(np.sort(values), 8, 'quantile')
+    expected_edges = np.unique(np.quantile(values, np.linspace(0, 1, 9)))
+    assert_matches(edges, expected_edges)
+    np.testing.assert_array_equal(counts, np.histogram(values, bins=expected_edges)[0])
+
+
+def test_log_histogram_matches_numpy(frame):
+    values = frame['Population'].dropna().to_numpy(dtype=float)
+    counts, edges = histogram(np.sort(values), 12, log=True)
+    expected_counts, expected_edges = np.histogram(np.log10(values[values > 0]), bins=12)
+    np.testing.assert_array_equal(counts, expected_counts)
+    assert_matches(edges, 10.0 ** expected_edges)
+
+
+def test_quantiles_match_numpy(frame):
+    values = np.sort(frame['GDP'].dropna().to_numpy(dtype=float))
+    q = np.linspace(0, 1, 41)
+    assert_matches(quantiles(values, q), np.quantile(values, q))
+
+
+@pytest.mark.parametrize('strategy', ['width', 'auto', 'fd', 'sturges'])
+def test_histogram_single_value(strategy):
+    counts, edges = histogram(np.array([5.0]), 10, strategy)
+    expected_counts, expected_edges = np.histogram([5.0], bins=10 if strategy == 'width' else strategy)
+    np.testing.assert_array_equal(counts, expected_counts)
+    assert_matches(edges, expected_edges)
+
+
+def test_histogram_without_values():
+    with pytest.raises(ValueError):
+        histogram(np.array([]))
+    with pytest.raises(ValueError):
+        histogram(np.array([-2.0, 0.0]), log=True)
+
+
+def test_sorted_column_per_region(frame, regions):
+    names, codes = regions
+    values = frame['Literacy'].to_numpy(dtype=float)
+    # One more group than there are regions: a region no country is in
+    column = SortedColumn(values, codes, len(names) + 1)
+    np.testing.assert_array_equal(column.all, np.sort(values[~np.isnan(values)]))
+    for g in range(len(names)):
+        group_values = values[codes == g]
+        np.testing.assert_array_equal(column.values(g), np.sort(group_values[~np.isnan(group_values)]))
+    assert len(column.values(len(names))) == 0
+
+
+# ----- Group aggregates -----
+
+@pytest.fixture(scope='module')
+def region_index(regions):
+    names, codes = regions
+    # One more label than there are regions: a region no country is in
+    return GroupIndex(codes, names + ['NOWHERE'])
+
+
+@pytest.mark.parametrize('column', ['GDP', 'Literacy', 'Population', 'Industry'])
+@pytest.mark.parametrize('name, reference', [
+    ('count', 'count'), ('sum', 'sum'), ('mean', 'mean'), ('std', 'std'), ('min', 'min'), ('max', 'max'),
+    ('median', 'median'), ('p90', lambda s: s.quantile(0.9)), ('p0', lambda s: s.quantile(0.0)),
+])
+def test_aggregate_matches_groupby(frame, region_index, column, name, reference):
+    values = frame[column].to_numpy(dtype=float)
+    result = aggregate(region_index, name, values)
+    expected = frame[column].groupby(region_index.codes).agg(reference)
+    expected = expected.reindex(range(region_index.n_groups))
+    # groupby has no row for the empty region; an empty count or sum is 0
+    if name in ('count', 'sum'):
+        expected = expected.fillna(0)
+    assert_matches(result, expected)
+
+
+@pytest.mark.parametrize('name', ['sum', 'mean'])
+def test_weighted_aggregate_matches_groupby(frame, region_index, name):
+    values, weights = frame['GDP'], frame['Population']
+    both = values.notna() & weights.notna()
+    groups = pd.Series(region_index.codes)[both.to_numpy()]
+    totals = (values * weights)[both].groupby(groups.to_numpy()).sum()
+    expected = totals if name == 'sum' else totals / weights[both].groupby(groups.to_numpy()).sum()
+    expected = expected.reindex(range(region_index.n_groups))
+    if name == 'sum':
+        expected = expected.fillna(0)
+    result = aggregate(region_index, name, values.to_numpy(dtype=float), weights.to_numpy(dtype=float))
+    assert_matches(result, expected)
+
+
+def test_group_rows(region_index):
+    for g in range(region_index.n_groups):
+        np.testing.assert_array_equal(region_index.rows(g), np.flatnonzero(region_index.codes == g))
+    assert len(region_index.rows(region_index.n_groups - 1)) == 0
+
+
+def test_aggregate_missing_groups_and_single_rows():
+    # Rows with no group (-1) are left out; group 1 has a single value and group 2 only NaN
+    index = GroupIndex([0, 0, -1, 1, 2, 0], ['a', 'b', 'c'])
+    values = np.array([1.0, 3.0, 100.0, 4.0, np.nan, np.nan])
+    expected = {
+        'count': [2, 1, 0], 'sum': [4.0, 4.0, 0.0], 'mean': [2.0, 4.0, np.nan],
+        'std': [np.sqrt(2.0), np.nan, np.nan], 'min': [1.0, 4.0, np.nan], 'max': [3.0, 4.0, np.nan],
+        'median': [2.0, 4.0, np.nan], 'p25': [1.5, 4.0, np.nan],
+    }
+    for name, result in expected.items():
+        assert_matches(aggregate(index, name, values), result)
+
+
+@pytest.mark.parametrize('spec', ['GDP', 'GDP:', 'GDP:mode', 'GDP:p101', 'GDP:px', 'GDP:median:Population',
+                                  'GDP:mean:Population:Area'])
+def test_parse_metric_rejects_invalid(spec):
+    with pytest.raises(ValueError):
+        parse_metric(spec)
+
+
+def test_parse_metric():
+    assert parse_metric('GDP:Mean:Population') == ('GDP', 'mean', 'Population')
+    assert parse_metric(' Literacy : p90 ') == ('Literacy', 'p90', None)
+
+
+# ----- Country search -----
+
+@pytest.fixture(scope='module')
+def country_index(frame, numeric):
+    return CountryIndex(frame['Country'], frame['Code'], frame[numeric].to_numpy(dtype=float), numeric)
+
+
+def test_lookup_by_code_and_name(frame, country_index):
+    for row, (code, name) in enumerate(zip(frame['Code'], frame['Country'])):
+        assert country_index.lookup(code) == row
+        assert country_index.lookup(code.lower()) == row
+        assert country_index.lookup(f"  {name.upper()} ") == row
+    assert country_index.lookup("cote d'IVOIRE") == frame.index[frame['Code'] == 'CIV'][0]
+    assert country_index.lookup('Nowhere') is None
+
+
+@pytest.mark.parametrize('query', ['ger', 'korea', 'south', 'st', 'congo, dem', 'ré', 'zz'])
+def test_prefix_matches_scan(frame, country_index, query):
+    names = [normalize(name) for name in frame['Country']]
+    query = normalize(query)
+    by_name = sorted((name, row) for row, name in enumerate(names) if name.startswith(query))
+    by_word = {row for row, name in enumerate(names)
+               if ' ' not in query and any(word.startswith(query) for word in re.findall(r'\w+', name))}
+    rows = country_index.prefix(query, limit=len(names))
+    # Whole-name matches come first, in name order, then the other word matches
+    assert rows[:len(by_name)] == [row for _, row in by_name]
+    assert set(rows) == {row for _, row in by_name} | by_word
+    assert len(rows) == len(set(rows))
+    assert country_index.prefix(query, limit=2) == rows[:2]
+
+
+@pytest.mark.parametrize('query', ['germny', 'cote divoire', 'untied states', 'korea', 'x'])
+def test_fuzzy_matches_trigram_jaccard(frame, country_index, query):
+    def grams(text):
+        padded = f"  {normalize(text)} "
+        return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+    query_grams = grams(query)
+    scores = np.array([len(query_grams & grams(name)) / len(query_grams | grams(name)) for name in frame['Country']])
+    expected = np.flatnonzero(scores >= MIN_FUZZY_SCORE)
+    expected = expected[np.argsort(-scores[expected], kind='stable')]
+    rows, result_scores = country_index.fuzzy(query, limit=len(scores))
+    np.testing.assert_array_equal(rows, expected)
+    assert_matches(result_scores, scores[expected])
+
+
+@pytest.mark.parametrize('features', [None, ['GDP', 'Literacy'], ['Industry', 'Agriculture', 'Climate']])
+@pytest.mark.parametrize('code', ['FRA', 'USA', 'ASM'])
+def test_similar_matches_pairwise_distances(frame, numeric, country_index, features, code):
+    columns = numeric if features is None else features
+    z = (frame[numeric] - frame[numeric].mean()) / frame[numeric].std(ddof=0)
+    z = z[columns].to_numpy()
+    row = country_index.lookup(code)
+    squares = np.nansum((z - z[row]) ** 2, axis=1)
+    shared = (~np.isnan(z - z[row])).sum(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        distances = np.sqrt(squares * len(columns) / shared)
+    distances[row] = np.inf
+    distances[shared == 0] = np.inf
+
+    rows, result = country_index.similar(row, 8, features)
+    expected = np.argsort(distances, kind='stable')[:8]
+    assert_matches(result, distances[expected])
+    assert_matches(distances[rows], distances[expected])
+
+
+def test_search_index_edge_cases():
+    index = CountryIndex(['Alpha', None, 'Beta'], ['AAA', 'BBB', None],
+                         np.array([[1.0, np.nan], [np.nan, 2.0], [3.0, np.nan]]), ['x', 'y'])
+    assert index.lookup('bbb') == 1
+    assert index.lookup('Beta') == 2
+    assert index.prefix('be', limit=5) == [2]
+    # Row 1 shares no feature with rows 0 and 2, so it has no neighbours
+    assert len(index.similar(1, 5)[0]) == 0
+    rows, distances = index.similar(0, 5)
+    np.testing.assert_array_equal(rows, [2])
+    assert_matches(distances, [2 * np.sqrt(2)])
+
+    single = CountryIndex(['Solo'], ['SOL'], np.array([[1.0]]), ['x'])
+    assert len(single.similar(0, 3)[0]) == 0
+    assert single.fuzzy('solo', 3)[0].tolist() == [0]
+    assert len(single.fuzzy('qqqq', 3)[0]) == 0
+
+    empty = CountryIndex([], [], np.empty((0, 1)), ['x'])
+    assert empty.lookup('anything') is None
+    assert empty.prefix('a', limit=5) == []
+    assert len(empty.fuzzy('a', 5)[0]) == 0